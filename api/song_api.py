@@ -1,225 +1,390 @@
-import os
-import json
-import shutil
-import logging
-import base64
-import mimetypes
-
-import python_utils as utils
-
-logger = logging.getLogger(__name__)
-
-class SongApi:
-    def __init__(self, db_handler, media_manager, executor, window_manager):
-        self.db = db_handler
-        self.media = media_manager
-        self.executor = executor
-        self.window_manager = window_manager
-
-    def get_song_data_uri(self, web_path):
-        """
-        Reads a song file and returns its content as a Base64-encoded data URI.
-        """
-        try:
-            os_path = utils.web_to_os_path(web_path)
-            if not os_path or not os.path.exists(os_path):
-                logger.warning(f"Data URI requested for non-existent file: {web_path}")
-                return None
-            
-            mime_type, _ = mimetypes.guess_type(os_path)
-            if mime_type is None:
-                mime_type = 'application/octet-stream' # Fallback
-            
-            with open(os_path, "rb") as f:
-                encoded_string = base64.b64encode(f.read()).decode('utf-8')
-            
-            logger.info(f"Generated data URI for {os_path}")
-            return f"data:{mime_type};base64,{encoded_string}"
-        except Exception as e:
-            logger.error(f"Error creating data URI for {web_path}: {e}", exc_info=True)
-            return None
-
-    def get_songs_by_paths(self, paths):
-        """Fetches full song data for a list of paths."""
-        try:
-            return self.db.get_songs_by_paths(paths)
-        except Exception as e:
-            logger.error("Error in get_songs_by_paths: %s", e, exc_info=True)
-            raise e
-
-    def search_all_songs(self, query):
-        """Searches all songs in the library based on a text and/or tag query."""
-        if not query or not query.strip():
-            return {'songs': [], 'suggestions': []}
-        try:
-            parsed_query = utils.parse_search_query(query)
-            return self.db.search_all_songs(parsed_query['text'], parsed_query['tags'])
-        except Exception as e:
-            logger.error("Error in search_all_songs for query '%s': %s", query, e, exc_info=True)
-            raise e
-
-    def search_in_playlist(self, playlist_name, query):
-        """Searches for songs within a specific playlist."""
-        if not query or not query.strip():
-            return {'songs': [], 'suggestions': []}
-        try:
-            parsed_query = utils.parse_search_query(query)
-            return self.db.search_in_playlist(playlist_name, parsed_query['text'], parsed_query['tags'])
-        except Exception as e:
-            logger.error("Error in search_in_playlist for query '%s' in playlist '%s': %s", query, playlist_name, e, exc_info=True)
-            raise e
-            
-    def import_from_files(self):
-        """
-        Opens a file dialog, gets metadata and duplicate status for selected files,
-        and returns a list of candidates for the user to review.
-        """
-        import webview
-        try:
-            file_types = ('Media Files (*.mp3;*.wav;*.flac;*.m4a;*.ogg;*.opus;*.mp4;*.mkv;*.webm;*.mov;*.avi)', 'All files (*.*)')
-            source_paths = self.window_manager.windows['main'].create_file_dialog(webview.OPEN_DIALOG, allow_multiple=True, file_types=file_types)
-            if not source_paths:
-                logger.info("File import dialog cancelled by user.")
-                return {'status': 'cancelled'}
-            
-            logger.info(f"User selected {len(source_paths)} file(s) for import.")
-            candidates = self.media.get_import_candidates_from_files(source_paths)
-            return {'status': 'success', 'entries': candidates}
-
-        except Exception as e:
-            logger.error("Error during file import dialog: %s", e, exc_info=True)
-            return {'status': 'error', 'message': str(e)}
-
-    def finalize_file_import(self, source_paths):
-        """
-        Finalizes the import of files after user confirmation.
-        This is called by the frontend if import_from_files returned 'confirmation_required'.
-        """
-        try:
-            if not source_paths:
-                return {'status': 'error', 'message': 'No file paths provided to import.'}
-            logger.info(f"Finalizing import of {len(source_paths)} file(s).")
-            new_songs = self.media.finalize_import_from_files(source_paths)
-            logger.info(f"Successfully imported {len(new_songs)} new song(s).")
-            return {'status': 'success', 'songs': new_songs}
-        except Exception as e:
-            logger.error("Error finalizing file import: %s", e, exc_info=True)
-            return {'status': 'error', 'message': str(e)}
-
-    def fetch_url_metadata(self, url):
-        """Fetches metadata for a given URL (e.g., YouTube) without downloading."""
-        logger.info(f"Fetching URL metadata for: {url}")
-        return self.media.fetch_url_metadata(url)
-
-    def start_url_download(self, url, indices=None):
-        """Delegates the start of a URL download to the MediaManager."""
-        return self.media.start_url_download(url, indices)
-
-    def get_cover_data(self, web_path):
-        """Gets the base64-encoded data URI for a song's cover image."""
-        try:
-            cover_web_path = self.db.get_cover_path_for_song(web_path)
-            if not cover_web_path: return None
-            return self.media.get_cover_data(utils.web_to_os_path(cover_web_path))
-        except Exception as e:
-            logger.error("Error getting cover data for '%s': %s", web_path, e, exc_info=True)
-            return None
-    
-    def _on_color_generated(self, song_web_path, future):
-        """Callback executed when accent color generation is done."""
-        try:
-            color = future.result()
-            if color:
-                self.db.save_song_color(song_web_path, color)
-                safe_path, safe_color = json.dumps(song_web_path), json.dumps(color)
-                self.window_manager.broadcast_js(f"window.updateSongAccentColor({safe_path}, {safe_color})")
-        except Exception as e:
-            logger.error(f"Error in color generation callback for {song_web_path}: {e}", exc_info=True)
-
-    def generate_accent_color(self, web_path):
-        """Generates a dominant color from a song's cover art in the background."""
-        cover_web_path = self.db.get_cover_path_for_song(web_path)
-        if not cover_web_path: return
-        cover_os_path = utils.web_to_os_path(cover_web_path)
-        future = self.executor.submit(self.media.generate_accent_color, cover_os_path)
-        future.add_done_callback(lambda f: self._on_color_generated(web_path, f))
-
-    def refresh_all_accent_colors(self):
-        """Kicks off a background task to recalculate all accent colors."""
-        return self.media.refresh_all_accent_colors()
-
-    def save_song_color(self, path, color):
-        """Saves a pre-calculated accent color for a song to the database."""
-        try:
-            self.db.save_song_color(path, color)
-            return {'status': 'success'}
-        except Exception as e:
-            logger.error(f"Error saving song color for '{path}': {e}", exc_info=True)
-            return {'status': 'error', 'message': str(e)}
-
-    def change_song_cover(self, web_path):
-        """Opens a file dialog to select a new cover for a song."""
-        import webview
-        file_types = ('Image Files (*.jpg;*.jpeg;*.png;*.webp)',)
-        new_cover_paths = self.window_manager.windows['main'].create_file_dialog(webview.OPEN_DIALOG, allow_multiple=False, file_types=file_types)
-        if not new_cover_paths:
-            logger.info("Change song cover dialog cancelled by user.")
-            return {'status': 'cancelled'}
-        
-        try:
-            new_cover_src_path = new_cover_paths[0]
-            logger.info(f"Changing cover for '{web_path}' with new file '{new_cover_src_path}'.")
-            old_cover_web_path = self.db.get_cover_path_for_song(web_path)
-            if old_cover_web_path: self.media.delete_files([utils.web_to_os_path(old_cover_web_path)])
-            base_name, _ = os.path.splitext(os.path.basename(utils.web_to_os_path(web_path)))
-            _, new_ext = os.path.splitext(new_cover_src_path)
-            new_cover_filename = f"{base_name}_cover{new_ext}"
-            new_cover_dest_os_path = os.path.join(self.media.SONGS_DIR, new_cover_filename)
-            shutil.copy2(new_cover_src_path, new_cover_dest_os_path)
-            new_cover_web_path = utils.to_web_path(new_cover_dest_os_path)
-            self.db.change_song_cover_in_db(web_path, new_cover_web_path)
-            self.media.embed_cover_in_file(web_path, new_cover_web_path)
-            coverData = self.media.get_cover_data(new_cover_dest_os_path)
-            logger.info(f"Successfully changed cover for '{web_path}'.")
-            return {'status': 'success', 'songUpdate': {'coverPath': new_cover_web_path, 'coverData': coverData}}
-        except Exception as e:
-            logger.error(f"Error changing song cover for '{web_path}': {e}", exc_info=True)
-            return {'status': 'error', 'message': str(e)}
-
-    def delete_songs(self, web_paths):
-        """Deletes songs from the database and their associated files."""
-        try:
-            logger.info(f"Deleting {len(web_paths)} song(s).")
-            files_to_delete = self.db.delete_songs(web_paths)
-            self.media.delete_files(files_to_delete)
-            logger.info(f"Successfully deleted songs and {len(files_to_delete)} associated file(s).")
-            return {'status': 'success'}
-        except Exception as e:
-            logger.error(f"Error deleting songs: {e}", exc_info=True)
-            return {'status': 'error', 'message': str(e)}
-        
-    def save_markers(self, path, markers):
-        """Saves playback markers for a song."""
-        try:
-            self.db.save_markers(path, markers)
-            logger.info(f"Saved {len(markers)} marker(s) for song '{path}'.")
-            return {'status': 'success'}
-        except Exception as e:
-            logger.error(f"Error saving markers for '{path}': {e}", exc_info=True)
-            return {'status': 'error', 'message': str(e)}
-
-    def update_song_details(self, paths, details):
-        """Updates details for one or more songs (name, artist, tags) in the database and optionally in the file."""
-        try:
-            logger.info(f"Updating details for {len(paths)} song(s) with data: {details}")
-            updated_songs = self.db.update_song_details(paths, details)
-            if details.get('saveToFile', False):
-                logger.info("Saving metadata to audio file tags.")
-                file_metadata_to_write = {k: v for k, v in details.items() if k in ['name', 'artist']}
-                if file_metadata_to_write:
-                    for path in paths:
-                        self.media.write_metadata_to_file(path, file_metadata_to_write)
-            return updated_songs
-        except Exception as e:
-            logger.error(f"Error updating song details: {e}", exc_info=True)
+import os
+import json
+import logging
+import base64
+import shutil
+import threading
+import time
+
+import webview
+
+import python_utils as utils
+
+logger = logging.getLogger(__name__)
+
+# Extension -> MIME type for the formats the app supports (see the file-type
+# filter in import_from_files). Avoids a mimetypes database parse on first use
+# and its lookup chain on every call.
+_EXT_MIME = {
+    '.mp3': 'audio/mpeg',
+    '.m4a': 'audio/mp4',
+    '.flac': 'audio/flac',
+    '.ogg': 'audio/ogg',
+    '.opus': 'audio/ogg',
+    '.wav': 'audio/wav',
+    '.mp4': 'video/mp4',
+    '.webm': 'video/webm',
+    '.mkv': 'video/x-matroska',
+    '.mov': 'video/quicktime',
+    '.avi': 'video/x-msvideo',
+}
+
+class SongApi:
+    # Accent-color results are flushed to the DB/frontend in batches: after
+    # this many pending results, or this many seconds after the first one.
+    COLOR_FLUSH_MAX_PENDING = 256
+    COLOR_FLUSH_INTERVAL = 0.1
+
+    # Search results are cached briefly so keystroke back-and-forth over the
+    # same query doesn't re-run the FTS query and row materialization.
+    SEARCH_CACHE_TTL = 5.0
+    SEARCH_CACHE_MAX_ENTRIES = 128
+
+    def __init__(self, db_handler, media_manager, executor, window_manager):
+        self.db = db_handler
+        self.media = media_manager
+        self.executor = executor
+        self.window_manager = window_manager
+        # Byte-budgeted caches for encoded payloads, keyed by (os_path, mtime_ns, size)
+        # so a changed file on disk never serves stale data.
+        self._audio_uri_cache = utils.SizedLRUCache(256 * 1024 * 1024)
+        self._cover_cache = utils.SizedLRUCache(64 * 1024 * 1024)
+        # Pending accent-color results awaiting a batched flush.
+        self._pending_colors = []
+        self._color_flush_lock = threading.Lock()
+        self._color_flush_timer = None
+        # key -> (monotonic timestamp, result)
+        self._search_cache = {}
+
+    def get_song_data_uri(self, web_path, inline=False):
+        """
+        Returns a playable URI for a song. By default this is the song's
+        https://fnote.local URL, which the url_loader serves with native
+        browser streaming — no base64 inflation and no full-file copy across
+        the JS bridge. Pass inline=True to force a base64 data URI instead.
+        """
+        try:
+            os_path = utils.web_to_os_path(web_path)
+            if not os_path or not os.path.exists(os_path):
+                logger.warning(f"Data URI requested for non-existent file: {web_path}")
+                return None
+
+            if not inline:
+                return web_path
+
+            stat_result = os.stat(os_path)
+            cache_key = (os_path, stat_result.st_mtime_ns, stat_result.st_size)
+            cached_uri = self._audio_uri_cache.get(cache_key)
+            if cached_uri is not None:
+                return cached_uri
+
+            mime_type = _EXT_MIME.get(os.path.splitext(os_path)[1].lower(), 'application/octet-stream')
+
+            # Stream the encode in 57KB chunks (a multiple of 3, so each chunk
+            # produces clean base64 with no padding) instead of reading the
+            # whole file into memory, which doubled peak RSS for large media.
+            buf = bytearray()
+            with open(os_path, "rb") as f:
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                while chunk := f.read(57 * 1024):
+                    buf.extend(base64.b64encode(chunk))
+            encoded_string = buf.decode('ascii')
+
+            logger.info(f"Generated data URI for {os_path}")
+            data_uri = f"data:{mime_type};base64,{encoded_string}"
+            self._audio_uri_cache.put(cache_key, data_uri)
+            return data_uri
+        except Exception as e:
+            logger.error(f"Error creating data URI for {web_path}: {e}", exc_info=True)
+            return None
+
+    def clear_media_cache(self):
+        """Empties the in-memory data-URI and cover caches."""
+        self._audio_uri_cache.clear()
+        self._cover_cache.clear()
+        logger.info("Media caches cleared.")
+        return {'status': 'success'}
+
+    def get_songs_by_paths(self, paths):
+        """Fetches full song data for a list of paths."""
+        try:
+            return self.db.get_songs_by_paths(paths)
+        except Exception as e:
+            logger.error("Error in get_songs_by_paths: %s", e, exc_info=True)
+            raise e
+
+    def _cached_search(self, key, run_query):
+        """Returns a recent cached result for a search key, or runs and caches the query."""
+        now = time.monotonic()
+        cached = self._search_cache.get(key)
+        if cached is not None and now - cached[0] < self.SEARCH_CACHE_TTL:
+            return cached[1]
+        result = run_query()
+        if len(self._search_cache) >= self.SEARCH_CACHE_MAX_ENTRIES:
+            self._search_cache.clear()
+        self._search_cache[key] = (now, result)
+        return result
+
+    def _invalidate_search_cache(self):
+        self._search_cache.clear()
+
+    def search_all_songs(self, query):
+        """Searches all songs in the library based on a text and/or tag query."""
+        if not query or not query.strip():
+            return {'songs': [], 'suggestions': []}
+        try:
+            parsed_query = utils.parse_search_query(query)
+            key = (None, parsed_query['text'], tuple(parsed_query['tags']))
+            return self._cached_search(key, lambda: self.db.search_all_songs(parsed_query['text'], parsed_query['tags']))
+        except Exception as e:
+            logger.error("Error in search_all_songs for query '%s': %s", query, e, exc_info=True)
+            raise e
+
+    def search_in_playlist(self, playlist_name, query):
+        """Searches for songs within a specific playlist."""
+        if not query or not query.strip():
+            return {'songs': [], 'suggestions': []}
+        try:
+            parsed_query = utils.parse_search_query(query)
+            key = (playlist_name, parsed_query['text'], tuple(parsed_query['tags']))
+            return self._cached_search(key, lambda: self.db.search_in_playlist(playlist_name, parsed_query['text'], parsed_query['tags']))
+        except Exception as e:
+            logger.error("Error in search_in_playlist for query '%s' in playlist '%s': %s", query, playlist_name, e, exc_info=True)
+            raise e
+            
+    def import_from_files(self):
+        """
+        Opens a file dialog, gets metadata and duplicate status for selected files,
+        and returns a list of candidates for the user to review.
+        """
+        try:
+            file_types = ('Media Files (*.mp3;*.wav;*.flac;*.m4a;*.ogg;*.opus;*.mp4;*.mkv;*.webm;*.mov;*.avi)', 'All files (*.*)')
+            source_paths = self.window_manager.windows['main'].create_file_dialog(webview.OPEN_DIALOG, allow_multiple=True, file_types=file_types)
+            if not source_paths:
+                logger.info("File import dialog cancelled by user.")
+                return {'status': 'cancelled'}
+            # Materialize once: the dialog's list grows by repeated appends, so a
+            # tuple drops any oversized backing array for large multi-selects.
+            source_paths = tuple(source_paths)
+
+            logger.info(f"User selected {len(source_paths)} file(s) for import.")
+            candidates = self.media.get_import_candidates_from_files(source_paths)
+            return {'status': 'success', 'entries': candidates}
+
+        except Exception as e:
+            logger.error("Error during file import dialog: %s", e, exc_info=True)
+            return {'status': 'error', 'message': str(e)}
+
+    def finalize_file_import(self, source_paths):
+        """
+        Finalizes the import of files after user confirmation.
+        This is called by the frontend if import_from_files returned 'confirmation_required'.
+        """
+        try:
+            if not source_paths:
+                return {'status': 'error', 'message': 'No file paths provided to import.'}
+            logger.info(f"Finalizing import of {len(source_paths)} file(s).")
+            new_songs = self.media.finalize_import_from_files(source_paths)
+            self._invalidate_search_cache()
+            logger.info(f"Successfully imported {len(new_songs)} new song(s).")
+            return {'status': 'success', 'songs': new_songs}
+        except Exception as e:
+            logger.error("Error finalizing file import: %s", e, exc_info=True)
+            return {'status': 'error', 'message': str(e)}
+
+    def fetch_url_metadata(self, url):
+        """Fetches metadata for a given URL (e.g., YouTube) without downloading."""
+        logger.info(f"Fetching URL metadata for: {url}")
+        return self.media.fetch_url_metadata(url)
+
+    def start_url_download(self, url, indices=None):
+        """Delegates the start of a URL download to the MediaManager."""
+        return self.media.start_url_download(url, indices)
+
+    def get_cover_data(self, web_path):
+        """Gets the base64-encoded data URI for a song's cover image."""
+        try:
+            cover_web_path = self.db.get_cover_path_for_song(web_path)
+            if not cover_web_path: return None
+            cover_os_path = utils.web_to_os_path(cover_web_path)
+            try:
+                stat_result = os.stat(cover_os_path)
+            except OSError:
+                return None
+            cache_key = (cover_os_path, stat_result.st_mtime_ns, stat_result.st_size)
+            cover_data = self._cover_cache.get(cache_key)
+            if cover_data is None:
+                cover_data = self.media.get_cover_data(cover_os_path)
+                if cover_data:
+                    self._cover_cache.put(cache_key, cover_data)
+            return cover_data
+        except Exception as e:
+            logger.error("Error getting cover data for '%s': %s", web_path, e, exc_info=True)
+            return None
+    
+    def _on_color_generated(self, song_web_path, future):
+        """Callback executed when accent color generation is done. Results are
+        collected and flushed in batches (one transaction, one broadcast)."""
+        try:
+            color = future.result()
+        except Exception as e:
+            logger.error(f"Error in color generation callback for {song_web_path}: {e}", exc_info=True)
+            return
+        if not color:
+            return
+        with self._color_flush_lock:
+            self._pending_colors.append((song_web_path, color))
+            flush_now = len(self._pending_colors) >= self.COLOR_FLUSH_MAX_PENDING
+            if not flush_now and self._color_flush_timer is None:
+                self._color_flush_timer = threading.Timer(self.COLOR_FLUSH_INTERVAL, self._flush_pending_colors)
+                self._color_flush_timer.daemon = True
+                self._color_flush_timer.start()
+        if flush_now:
+            self._flush_pending_colors()
+
+    def _flush_pending_colors(self):
+        """Drains pending accent-color results into one DB write and one JS broadcast."""
+        with self._color_flush_lock:
+            if self._color_flush_timer is not None:
+                self._color_flush_timer.cancel()
+                self._color_flush_timer = None
+            pending, self._pending_colors = self._pending_colors, []
+        if not pending:
+            return
+        try:
+            self.db.save_song_colors_bulk(pending)
+            payload = utils.json_dumps([{'path': path, 'color': color} for path, color in pending])
+            self.window_manager.broadcast_js(f"window.updateSongAccentColorsBatch({payload})")
+        except Exception as e:
+            logger.error(f"Error flushing accent color batch: {e}", exc_info=True)
+
+    def generate_accent_color(self, web_path):
+        """Generates a dominant color from a song's cover art in the background."""
+        cover_web_path = self.db.get_cover_path_for_song(web_path)
+        if not cover_web_path: return
+        cover_os_path = utils.web_to_os_path(cover_web_path)
+        future = self.executor.submit(self.media.generate_accent_color, cover_os_path)
+        future.add_done_callback(lambda f: self._on_color_generated(web_path, f))
+
+    def refresh_all_accent_colors(self):
+        """Kicks off a background task to recalculate all accent colors."""
+        return self.media.refresh_all_accent_colors()
+
+    def save_song_color(self, path, color):
+        """Saves a pre-calculated accent color for a song to the database."""
+        try:
+            self.db.save_song_color(path, color)
+            return {'status': 'success'}
+        except Exception as e:
+            logger.error(f"Error saving song color for '{path}': {e}", exc_info=True)
+            return {'status': 'error', 'message': str(e)}
+
+    def change_song_cover(self, web_path):
+        """Opens a file dialog to select a new cover for a song."""
+        file_types = ('Image Files (*.jpg;*.jpeg;*.png;*.webp)',)
+        new_cover_paths = self.window_manager.windows['main'].create_file_dialog(webview.OPEN_DIALOG, allow_multiple=False, file_types=file_types)
+        if not new_cover_paths:
+            logger.info("Change song cover dialog cancelled by user.")
+            return {'status': 'cancelled'}
+
+        # The copy/embed/encode pipeline can block for hundreds of ms on large
+        # files, so run it on the executor instead of the JS-bridge thread.
+        new_cover_src_path = new_cover_paths[0]
+        logger.info(f"Changing cover for '{web_path}' with new file '{new_cover_src_path}'.")
+        future = self.executor.submit(self._apply_new_cover, web_path, new_cover_src_path)
+        future.add_done_callback(lambda f: self._on_cover_applied(web_path, f))
+        return {'status': 'queued'}
+
+    def _apply_new_cover(self, web_path, new_cover_src_path):
+        """Copies a new cover into place, embeds it and returns the update payload."""
+        old_cover_web_path = self.db.get_cover_path_for_song(web_path)
+        if old_cover_web_path:
+            old_cover_os_path = utils.web_to_os_path(old_cover_web_path)
+            self.media.delete_files([old_cover_os_path])
+            self._cover_cache.evict(lambda key: key[0] == old_cover_os_path)
+        base_name, _ = os.path.splitext(os.path.basename(utils.web_to_os_path(web_path)))
+        _, new_ext = os.path.splitext(new_cover_src_path)
+        new_cover_filename = f"{base_name}_cover{new_ext}"
+        new_cover_dest_os_path = os.path.join(self.media.SONGS_DIR, new_cover_filename)
+        # Read the cover once and reuse the bytes for the copy, the tag embed
+        # and the data URI instead of re-reading the file at each step.
+        with open(new_cover_src_path, 'rb') as f:
+            cover_bytes = f.read()
+        with open(new_cover_dest_os_path, 'wb') as f:
+            f.write(cover_bytes)
+        shutil.copystat(new_cover_src_path, new_cover_dest_os_path)
+        new_cover_web_path = utils.to_web_path(new_cover_dest_os_path)
+        self.db.change_song_cover_in_db(web_path, new_cover_web_path)
+        self.media.embed_cover_in_file(web_path, new_cover_web_path, data_bytes=cover_bytes)
+        image_format = new_ext.lstrip('.').lower()
+        if image_format == 'jpg': image_format = 'jpeg'
+        coverData = f"data:image/{image_format};base64,{base64.b64encode(cover_bytes).decode('utf-8')}"
+        return {'coverPath': new_cover_web_path, 'coverData': coverData}
+
+    def _on_cover_applied(self, web_path, future):
+        """Callback executed when a background cover change finishes."""
+        try:
+            song_update = future.result()
+            safe_path = json.dumps(web_path)
+            safe_cover_path = json.dumps(song_update['coverPath'])
+            safe_cover_data = json.dumps(song_update['coverData'])
+            self.window_manager.broadcast_js(f"window.updateSongCover({safe_path}, {safe_cover_path}, {safe_cover_data})")
+            logger.info(f"Successfully changed cover for '{web_path}'.")
+        except Exception as e:
+            logger.error(f"Error changing song cover for '{web_path}': {e}", exc_info=True)
+            safe_message = json.dumps(f"Failed to change cover: {e}")
+            self.window_manager.broadcast_js(f"window.showToastFromBackend({safe_message}, 'error')")
+
+    def delete_songs(self, web_paths):
+        """Deletes songs from the database and their associated files."""
+        try:
+            logger.info(f"Deleting {len(web_paths)} song(s).")
+            files_to_delete = self.db.delete_songs(web_paths)
+            self.media.delete_files_parallel(files_to_delete)
+            deleted_set = set(files_to_delete)
+            self._audio_uri_cache.evict(lambda key: key[0] in deleted_set)
+            self._cover_cache.evict(lambda key: key[0] in deleted_set)
+            self._invalidate_search_cache()
+            logger.info(f"Successfully deleted songs and {len(files_to_delete)} associated file(s).")
+            return {'status': 'success'}
+        except Exception as e:
+            logger.error(f"Error deleting songs: {e}", exc_info=True)
+            return {'status': 'error', 'message': str(e)}
+        
+    def save_markers(self, path, markers):
+        """Saves playback markers for a song."""
+        try:
+            self.db.save_markers(path, markers)
+            logger.info(f"Saved {len(markers)} marker(s) for song '{path}'.")
+            return {'status': 'success'}
+        except Exception as e:
+            logger.error(f"Error saving markers for '{path}': {e}", exc_info=True)
+            return {'status': 'error', 'message': str(e)}
+
+    def update_song_details(self, paths, details):
+        """Updates details for one or more songs (name, artist, tags) in the database and optionally in the file."""
+        try:
+            logger.info(f"Updating details for {len(paths)} song(s) with data: {details}")
+            updated_songs = self.db.update_song_details(paths, details)
+            self._invalidate_search_cache()
+            if details.get('saveToFile', False):
+                logger.info("Saving metadata to audio file tags.")
+                file_metadata_to_write = {k: v for k, v in details.items() if k in ['name', 'artist']}
+                if file_metadata_to_write:
+                    # Each write opens, parses and rewrites an audio file, so
+                    # fan the I/O out across the executor for bulk edits. A
+                    # failed file write shouldn't abort the rest of the batch.
+                    def write_one(path):
+                        try:
+                            self.media.write_metadata_to_file(path, file_metadata_to_write)
+                            return None
+                        except Exception as e:
+                            return (path, str(e))
+                    failures = [f for f in self.executor.map(write_one, paths) if f]
+                    if failures:
+                        logger.warning(f"Failed to write file metadata for {len(failures)} song(s): {failures}")
+            return updated_songs
+        except Exception as e:
+            logger.error(f"Error updating song details: {e}", exc_info=True)
             raise e
\ No newline at end of file
@@ -23,9 +23,7 @@ class TagApi:
     def rename_tag(self, tag_id, new_name):
         """Renames a user-defined tag and returns the updated tag data."""
         try:
-            self.db.rename_tag(int(tag_id), new_name)
-            with self.db._get_db_conn() as conn:
-                updated_tag_data = self.db._get_all_tags(conn.cursor())
+            updated_tag_data = self.db.rename_tag(int(tag_id), new_name)
             logger.info(f"Renamed tag ID {tag_id} to '{new_name}'.")
             return {'status': 'success', 'tagData': updated_tag_data}
         except ValueError as e:
@@ -41,9 +39,7 @@ class TagApi:
     def delete_tag(self, tag_id):
         """Deletes a user-defined tag and returns the updated tag data."""
         try:
-            self.db.delete_tag(int(tag_id))
-            with self.db._get_db_conn() as conn:
-                updated_tag_data = self.db._get_all_tags(conn.cursor())
+            updated_tag_data = self.db.delete_tag(int(tag_id))
             logger.info(f"Deleted tag ID {tag_id}.")
             return {'status': 'success', 'tagData': updated_tag_data}
         except ValueError as e:
@@ -1,8 +1,11 @@
 import webview
 import concurrent.futures
-from threading import Timer
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Thread, Event, Lock
 import logging
-import mimetypes
+import mmap
+import re
 
 import config_handler
 from database import DatabaseHandler
@@ -22,6 +25,14 @@ from api.song_api import SongApi
 from api.playlist_api import PlaylistApi
 from api.tag_api import TagApi
 
+def _warmup_worker():
+    """Pre-imports heavy modules in executor workers so the first real task
+    (URL download, metadata fetch, accent color) doesn't pay the import cost."""
+    try:
+        import yt_dlp, mutagen, PIL.Image  # noqa: F401
+    except Exception:
+        pass
+
 class Api:
     """The backend API facade exposed to pywebview. It delegates calls to specialized API modules."""
 
@@ -37,14 +48,25 @@ class Api:
         config_handler.ensure_config_exists()
         self.config = config_handler.load_config()
         
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
-        self.config_save_timer = None
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix='fnote-bg', initializer=_warmup_worker)
+        # Spin up every worker now so the warmup imports overlap the rest of init.
+        for _ in range(4):
+            self.executor.submit(lambda: None)
+
+        # Window geometry saves are debounced by one persistent writer thread
+        # instead of a fresh Timer per event, so a window drag doesn't spawn
+        # hundreds of short-lived threads.
+        self._cfg_dirty = Event()
+        self._cfg_writer_shutdown = Event()
+        self._cfg_writer_thread = Thread(target=self._config_writer_loop, daemon=True)
+        self._cfg_writer_thread.start()
         
         # --- Managers (instantiated after dependencies) ---
         self.window_manager = WindowManager(self, self.config)
         # MediaManager now needs executor and window_manager for background tasks
         self.media = MediaManager(self.db, self.executor, self.window_manager)
-        self.background_services = BackgroundServices(self.config, self.window_manager)
+        self.background_services = BackgroundServices(self.config, self.window_manager, self.executor)
 
         # --- DB and Directory Init (after MediaManager to ensure yt-dlp check) ---
         self.db.init_database()
@@ -61,11 +83,19 @@ class Api:
         self.logger.info("Application API initialized successfully.")
 
     def _save_config_debounced(self):
-        """Saves the config file after a short delay to prevent excessive writes."""
-        if self.config_save_timer and self.config_save_timer.is_alive():
-            self.config_save_timer.cancel()
-        self.config_save_timer = Timer(1.0, config_handler.save_config, [self.config])
-        self.config_save_timer.start()
+        """Flags the config as dirty; the writer thread flushes it after a short delay."""
+        self._cfg_dirty.set()
+
+    def _config_writer_loop(self):
+        """Waits for dirty flags and writes the config once the events settle."""
+        while not self._cfg_writer_shutdown.is_set():
+            self._cfg_dirty.wait()
+            if self._cfg_writer_shutdown.is_set():
+                break
+            self._cfg_dirty.clear()
+            # Let a burst of resize/move events settle into one write.
+            self._cfg_writer_shutdown.wait(1.0)
+            config_handler.save_config(self.config)
 
     # --- Delegated API Methods ---
     
@@ -110,8 +140,9 @@ class Api:
     def finalize_file_import(self, source_paths): return self.song.finalize_file_import(source_paths)
     def fetch_url_metadata(self, url): return self.song.fetch_url_metadata(url)
     def start_url_download(self, url, indices=None): return self.song.start_url_download(url, indices)
-    def get_song_data_uri(self, web_path): return self.song.get_song_data_uri(web_path)
+    def get_song_data_uri(self, web_path, inline=False): return self.song.get_song_data_uri(web_path, inline)
     def get_cover_data(self, web_path): return self.song.get_cover_data(web_path)
+    def clear_media_cache(self): return self.song.clear_media_cache()
     def generate_accent_color(self, web_path): return self.song.generate_accent_color(web_path)
     def refresh_all_accent_colors(self): return self.song.refresh_all_accent_colors()
     def save_song_color(self, path, color): return self.song.save_song_color(path, color)
@@ -121,7 +152,10 @@ class Api:
     def update_song_details(self, paths, details): return self.song.update_song_details(paths, details)
 
     # PlaylistApi methods
-    def add_songs_to_playlist(self, playlist_name, songs): return self.playlist.add_songs_to_playlist(playlist_name, songs)
+    def add_songs_to_playlist(self, playlist_name, songs):
+        result = self.playlist.add_songs_to_playlist(playlist_name, songs)
+        self.song._invalidate_search_cache()
+        return result
     def reorder_playlist_songs(self, playlist_name, song_path_order): return self.playlist.reorder_playlist_songs(playlist_name, song_path_order)
     def reorder_playlists(self, order): return self.playlist.reorder_playlists(order)
     def move_songs_to_playlist(self, source, target, paths): return self.playlist.move_songs_to_playlist(source, target, paths)
@@ -137,6 +171,104 @@ class Api:
     def delete_tag(self, tag_id): return self.tag.delete_tag(tag_id)
     def merge_tags(self, source_tag_id, dest_tag_id): return self.tag.merge_tags(source_tag_id, dest_tag_id)
 
+# Files above this size are served from a memory mapping instead of being read
+# into a Python bytes object, so the kernel pages them straight into the
+# webview buffer and repeated range requests don't re-read from disk.
+_MMAP_THRESHOLD = 1024 * 1024
+_MMAP_CACHE_MAX_ENTRIES = 64
+_mmap_cache = OrderedDict()  # (path, mtime_ns, size) -> mmap
+_mmap_cache_lock = Lock()
+
+# Small files (cover art, thumbnails) are requested in bursts when a playlist
+# renders; caching their bodies turns the repeat open/read/close syscall
+# triples into dictionary lookups.
+_small_file_cache = python_utils.SizedLRUCache(32 * 1024 * 1024)
+
+def _evict_served_file_caches(file_paths):
+    """Closes cached mappings and drops cached bodies for the given OS paths.
+
+    The delete flows call this (via media_manager's hook) before unlinking:
+    on Windows a live memory mapping holds a sharing lock on its file, so a
+    stale cache entry would make os.remove fail and leak the file on disk
+    while its database row is already gone.
+    """
+    targets = {p for p in file_paths if p}
+    if not targets:
+        return
+    with _mmap_cache_lock:
+        for key in [k for k in _mmap_cache if k[0] in targets]:
+            mapped = _mmap_cache.pop(key)
+            try:
+                mapped.close()
+            except BufferError:
+                # A request handler still holds a buffer into the map; the
+                # mapping closes when that reference is dropped.
+                logging.getLogger(__name__).warning(f"Mapping for {key[0]} still in use; deferring close.")
+    _small_file_cache.evict(lambda key: key[0] in targets)
+
+# media_manager can't import app (circular), so the hook is injected here.
+import media_manager as _media_manager_module
+_media_manager_module.set_file_cache_evictor(_evict_served_file_caches)
+
+# "bytes=start-end" with either bound optional ("500-", "-500").
+_RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+
+# MIME types for the extensions the app actually serves. Checked before
+# mimetypes so the common case is one dict get and the first media request
+# doesn't pay for mimetypes' lazy database init.
+_FAST_MIME = {
+    '.mp3': 'audio/mpeg', '.m4a': 'audio/mp4', '.flac': 'audio/flac',
+    '.ogg': 'audio/ogg', '.wav': 'audio/wav', '.webp': 'image/webp',
+    '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png',
+}
+
+@lru_cache(maxsize=64)
+def _mime_for(ext):
+    """Returns the MIME type for a lowercased file extension, memoized."""
+    # Deferred so requests for the common extensions in _FAST_MIME never
+    # trigger mimetypes' database init.
+    import mimetypes
+    return mimetypes.guess_type('x' + ext)[0] or 'application/octet-stream'
+
+def _get_file_body(file_path, fd, stat_result):
+    """
+    Returns a buffer with the contents of an already-open file for serving.
+    Takes ownership of fd and closes it.
+
+    Small files are read normally. Large files are memory-mapped, and the
+    mappings are kept in a small LRU keyed by (path, mtime, size) so the
+    repeated seek/range requests the <audio> element issues reuse one mapping.
+    """
+    cache_key = (file_path, stat_result.st_mtime_ns, stat_result.st_size)
+    if stat_result.st_size < _MMAP_THRESHOLD:
+        content = _small_file_cache.get(cache_key)
+        if content is not None:
+            os.close(fd)
+            return content
+        with os.fdopen(fd, 'rb') as f:
+            content = f.read()
+        _small_file_cache.put(cache_key, content)
+        return content
+
+    with _mmap_cache_lock:
+        cached = _mmap_cache.get(cache_key)
+        if cached is not None:
+            _mmap_cache.move_to_end(cache_key)
+            os.close(fd)
+            return cached
+
+    try:
+        mapped = mmap.mmap(fd, stat_result.st_size, access=mmap.ACCESS_READ)
+    finally:
+        os.close(fd)  # The mapping outlives the descriptor.
+
+    with _mmap_cache_lock:
+        _mmap_cache[cache_key] = mapped
+        while len(_mmap_cache) > _MMAP_CACHE_MAX_ENTRIES:
+            _, evicted = _mmap_cache.popitem(last=False)
+            evicted.close()
+    return mapped
+
 def url_loader(request):
     """
     A custom loader to handle the 'https://fnote.local' domain. This function intercepts
@@ -149,23 +281,55 @@ def url_loader(request):
     try:
         # Use our existing utility function to get the real, absolute OS path
         file_path = python_utils.web_to_os_path(request.url)
-        
-        if not file_path or not os.path.exists(file_path):
+
+        # One os.open doubles as the existence check (no stat+open TOCTOU
+        # window) and supplies the fd for fstat and the body read.
+        fd = None
+        if file_path:
+            try:
+                fd = os.open(file_path, os.O_RDONLY)
+            except OSError:
+                pass
+        if fd is None:
             logging.warning(f"File not found for request: {request.url}")
             return webview.Response(status_code=404, text='File not found')
-        
-        # Guess the MIME type from the file extension (e.g., 'audio/mpeg' for .mp3)
-        mime_type, _ = mimetypes.guess_type(file_path)
-        if mime_type is None:
-            mime_type = 'application/octet-stream' # Fallback
-        
-        # Read the file in binary mode and serve it
-        with open(file_path, 'rb') as f:
-            content = f.read()
-        
-        logging.info(f"Serving local file: {file_path} as {mime_type}")
+        stat_result = os.fstat(fd)
+
+        # Resolve the MIME type from the file extension (e.g., 'audio/mpeg' for .mp3)
+        ext = os.path.splitext(file_path)[1].lower()
+        mime_type = _FAST_MIME.get(ext) or _mime_for(ext)
+
+        # Serve from a memory mapping for large files so the contents aren't
+        # copied into a Python bytes object on every request.
+        content = _get_file_body(file_path, fd, stat_result)
+        size = stat_result.st_size
+
         # Allow cross-origin requests for this resource, which can sometimes be necessary
-        headers = {'Access-Control-Allow-Origin': '*'}
+        headers = {'Access-Control-Allow-Origin': '*', 'Accept-Ranges': 'bytes'}
+
+        # Honor Range requests from the media element so a seek only transfers
+        # the requested slice instead of the whole track.
+        range_header = (getattr(request, 'headers', None) or {}).get('Range')
+        if range_header:
+            match = _RANGE_RE.match(range_header)
+            if match and (match.group(1) or match.group(2)):
+                if match.group(1):
+                    start = int(match.group(1))
+                    end = int(match.group(2)) if match.group(2) else size - 1
+                else:
+                    # Suffix form: last N bytes.
+                    start = max(0, size - int(match.group(2)))
+                    end = size - 1
+                end = min(end, size - 1)
+                if start <= end:
+                    data = content[start:end + 1]
+                    headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+                    headers['Content-Length'] = str(len(data))
+                    logging.info(f"Serving local file range {start}-{end}: {file_path} as {mime_type}")
+                    return webview.Response(body=data, status_code=206, mime_type=mime_type, headers=headers)
+
+        logging.info(f"Serving local file: {file_path} as {mime_type}")
+        headers['Content-Length'] = str(size)
         return webview.Response(body=content, mime_type=mime_type, headers=headers)
     except Exception as e:
         logging.error(f"Error in url_loader for {request.url}: {e}", exc_info=True)
@@ -175,15 +339,28 @@ if __name__ == '__main__':
     setup_logging()
     api = Api()
 
+    # Drags fire resize/move events per pixel; ignore changes under this many
+    # pixels (Manhattan distance) since the last accepted geometry.
+    GEOMETRY_EVENT_THRESHOLD = 4
+    last_size = [api.config.get('windowWidth', 0), api.config.get('windowHeight', 0)]
+    last_pos = [api.config.get('windowX', 0), api.config.get('windowY', 0)]
+
     def on_resized(width, height):
+        if abs(width - last_size[0]) + abs(height - last_size[1]) < GEOMETRY_EVENT_THRESHOLD:
+            return
         if api.window_manager.windows['main'] and not api.window_manager.windows['main'].hidden:
+            last_size[0], last_size[1] = width, height
             api.config['windowWidth'], api.config['windowHeight'] = width, height
             api._save_config_debounced()
 
     def on_moved(x, y):
+        x, y = int(x), int(y)
+        if abs(x - last_pos[0]) + abs(y - last_pos[1]) < GEOMETRY_EVENT_THRESHOLD:
+            return
         if api.window_manager.windows['main'] and not api.window_manager.windows['main'].hidden:
-             api.config['windowX'], api.config['windowY'] = int(x), int(y)
-             api._save_config_debounced()
+            last_pos[0], last_pos[1] = x, y
+            api.config['windowX'], api.config['windowY'] = x, y
+            api._save_config_debounced()
 
     def on_closing():
         active_window = webview.active_window()
@@ -196,10 +373,14 @@ if __name__ == '__main__':
 
     def on_closed():
         logging.info("Window closed. Shutting down services.")
-        if api.config_save_timer and api.config_save_timer.is_alive():
-            api.config_save_timer.cancel()
+        api._cfg_writer_shutdown.set()
+        api._cfg_dirty.set()  # Wake the writer thread so it can exit.
+        api._cfg_writer_thread.join(timeout=2)
         config_handler.save_config(api.config)
         api.background_services.shutdown()
+        api.db.shutdown()
+        api.media.download_executor.shutdown(wait=False)
+        api.media.compute_executor.shutdown(wait=False)
         api.executor.shutdown(wait=False)
 
     main_window = api.window_manager.create_main_window()
@@ -1,305 +1,639 @@
-import sys
-import os
-import threading
-import json
-import subprocess
-import re
-import logging
-
-import config_handler
-
-logger = logging.getLogger(__name__)
-
-# Platform-specific imports for auto-pause feature
-PYCAW_AVAILABLE = False
-if sys.platform == "win32":
-    try:
-        from pycaw.pycaw import AudioUtilities
-        from comtypes import CoInitialize, CoUninitialize, COMError
-        PYCAW_AVAILABLE = True
-    except (ImportError, OSError):
-        logger.warning("pycaw or its dependencies not found. Auto-pause feature will be disabled on Windows.")
-
-# Import for Discord Rich Presence
-PYPRESENCE_AVAILABLE = False
-DISCORD_CLIENT_ID = "1395848010004566186"
-try:
-    import pypresence
-    PYPRESENCE_AVAILABLE = True
-except ImportError:
-    logger.warning("pypresence not found. Discord Rich Presence will be disabled.")
-except Exception as e:
-    logger.warning(f"An unexpected error occurred while importing pypresence: {e}")
-
-
-class BackgroundServices:
-    def __init__(self, config, window_manager):
-        self.config = config
-        self.window_manager = window_manager
-        
-        # Auto-pause state
-        self.auto_pause_thread = None
-        self.stop_auto_pause_event = threading.Event()
-        self.current_process_name = os.path.basename(sys.executable).lower()
-        self.audio_proc_blacklist = [p.lower() for p in self.config.get('autoPauseAudioProcBlacklist', [])]
-
-        # Discord Rich Presence state
-        self.rpc = None
-        self.rpc_thread = None
-
-    def start(self):
-        """Starts all enabled background services."""
-        if self.config.get('autoPauseOnExternalAudio'):
-            self.start_auto_pause_monitor()
-        if self.config.get('discordRichPresence'):
-            self.start_rich_presence()
-
-    def shutdown(self):
-        """Stops all running background services."""
-        self.stop_auto_pause_monitor()
-        self.stop_rich_presence()
-
-    # --- Auto-pause logic ---
-    def _monitor_external_audio(self):
-        if sys.platform == "win32": self._monitor_audio_windows()
-        elif sys.platform.startswith("linux"): self._monitor_audio_linux()
-        elif sys.platform == "darwin": self._monitor_audio_macos()
-        else: logger.warning(f"Auto-pause is not supported on this platform ({sys.platform}).")
-
-    def _monitor_audio_windows(self):
-        logger.info("Starting external audio monitor thread for Windows...")
-        CoInitialize()
-        last_state = False
-        try:
-            while not self.stop_auto_pause_event.is_set():
-                is_external_audio_active, active_sources = False, []
-                try:
-                    for session in AudioUtilities.GetAllSessions():
-                        if not (session.Process and session.State == 1): continue
-                        try:
-                            # The original GetPeakValue() method can be unreliable on systems with
-                            # certain audio drivers or enhancement software. This revised logic
-                            # first checks the process name against the app itself and the blacklist.
-                            # Then, it checks if the session is simply active and unmuted, which is
-                            # more reliable, though potentially less precise (more false positives).
-                            # This brings Windows behavior more in line with other platforms.
-                            process_name_full = session.Process.name()
-                            process_name_lower = process_name_full.lower()
-                            if process_name_lower == self.current_process_name or process_name_lower in self.audio_proc_blacklist: continue
-                            
-                            if not session.SimpleAudioVolume.GetMute():
-                                is_external_audio_active = True
-                                active_sources.append(process_name_full)
-                        except (COMError, AttributeError, ValueError):
-                            # Some sessions may not have all properties (e.g., Process.name(), GetMute()).
-                            # It's safe to just skip them.
-                            pass
-                except Exception as e:
-                    logger.error(f"Unhandled exception in Windows audio session check: {e}", exc_info=True)
-                    self.stop_auto_pause_event.wait(5)
-                    continue
-                if is_external_audio_active != last_state:
-                    logger.info(f"External audio {'DETECTED' if is_external_audio_active else 'stopped'}. Sources: {list(set(active_sources))}")
-                    last_state = is_external_audio_active
-                    payload = {'isActive': is_external_audio_active, 'sources': list(set(active_sources))}
-                    try:
-                        self.window_manager.broadcast_js(f"window.setExternalAudioState({json.dumps(payload)})")
-                    except Exception as e:
-                        logger.error(f"Could not communicate with frontend to set audio state: {e}")
-                        break
-                self.stop_auto_pause_event.wait(1)
-        finally:
-            try:
-                self.window_manager.broadcast_js(f"window.setExternalAudioState({json.dumps({'isActive': False, 'sources': []})})")
-            except: pass
-            CoUninitialize()
-            logger.info("External audio monitor thread for Windows stopped.")
-
-    def _monitor_audio_linux(self):
-        logger.info("Starting external audio monitor thread for Linux (pactl)...")
-        last_state = False
-        binary_re, name_re = re.compile(r'^\s*application\.process\.binary = "(.*?)"', re.M), re.compile(r'^\s*application\.name = "(.*?)"', re.M)
-        try:
-            while not self.stop_auto_pause_event.is_set():
-                is_external_audio_active, active_sources = False, []
-                try:
-                    result = subprocess.run(['pactl', 'list', 'sink-inputs'], capture_output=True, text=True, check=True, timeout=3)
-                    for block in result.stdout.split('Sink Input #'):
-                        if not block.strip(): continue
-                        if ('State: RUNNING' in block and 'Mute: yes' not in block and 'Corked: yes' not in block):
-                            binary_match = binary_re.search(block)
-                            if binary_match:
-                                app_binary = binary_match.group(1).lower()
-                                if app_binary == self.current_process_name or app_binary in self.audio_proc_blacklist: continue
-                                is_external_audio_active = True
-                                name_match = name_re.search(block)
-                                app_name = name_match.group(1) if name_match else app_binary
-                                if app_name not in active_sources: active_sources.append(app_name)
-                except FileNotFoundError:
-                    logger.warning("`pactl` command not found. Auto-pause on Linux requires PulseAudio or PipeWire with the pactl utility.")
-                    break
-                except (subprocess.TimeoutExpired, subprocess.CalledProcessError): pass
-                except Exception as e:
-                    logger.error(f"Unhandled exception in Linux audio check: {e}", exc_info=True)
-                    self.stop_auto_pause_event.wait(5)
-                    continue
-                if is_external_audio_active != last_state:
-                    logger.info(f"External audio {'DETECTED' if is_external_audio_active else 'stopped'}. Sources: {active_sources}")
-                    last_state = is_external_audio_active
-                    payload = {'isActive': is_external_audio_active, 'sources': active_sources}
-                    try:
-                        self.window_manager.broadcast_js(f"window.setExternalAudioState({json.dumps(payload)})")
-                    except Exception as e:
-                        logger.error(f"Could not communicate with frontend to set audio state: {e}")
-                        break
-                self.stop_auto_pause_event.wait(2)
-        finally:
-            try:
-                self.window_manager.broadcast_js(f"window.setExternalAudioState({json.dumps({'isActive': False, 'sources': []})})")
-            except: pass
-            logger.info("External audio monitor thread for Linux stopped.")
-
-    def _monitor_audio_macos(self):
-        logger.info("Starting external audio monitor thread for macOS (system_profiler)...")
-        last_state = False
-        try:
-            while not self.stop_auto_pause_event.is_set():
-                is_external_audio_active, active_sources = False, []
-                try:
-                    result = subprocess.run(['system_profiler', 'SPAudioDataType', '-json'], capture_output=True, text=True, check=True, timeout=5)
-                    audio_data = json.loads(result.stdout)
-                    if 'SPAudioDataType' in audio_data:
-                        for device in audio_data['SPAudioDataType']:
-                            if '_items' in device:
-                                for item in device['_items']:
-                                    if item.get('spaudio_output_running') == 'Yes':
-                                        is_external_audio_active = True; break
-                                if is_external_audio_active: break
-                    if is_external_audio_active: active_sources = ["Another Application"]
-                except (FileNotFoundError, subprocess.TimeoutExpired, json.JSONDecodeError, KeyError): pass
-                except Exception as e:
-                    logger.error(f"Unhandled exception in macOS audio check: {e}", exc_info=True)
-                    self.stop_auto_pause_event.wait(5)
-                    continue
-                if is_external_audio_active != last_state:
-                    logger.info(f"External audio {'DETECTED' if is_external_audio_active else 'stopped'}.")
-                    last_state = is_external_audio_active
-                    payload = {'isActive': is_external_audio_active, 'sources': active_sources}
-                    try:
-                        self.window_manager.broadcast_js(f"window.setExternalAudioState({json.dumps(payload)})")
-                    except Exception as e:
-                        logger.error(f"Could not communicate with frontend to set audio state: {e}")
-                        break
-                self.stop_auto_pause_event.wait(3)
-        finally:
-            try:
-                self.window_manager.broadcast_js(f"window.setExternalAudioState({json.dumps({'isActive': False, 'sources': []})})")
-            except: pass
-            logger.info("External audio monitor thread for macOS stopped.")
-
-    def start_auto_pause_monitor(self):
-        if self.auto_pause_thread is None or not self.auto_pause_thread.is_alive():
-            logger.info("Activating auto-pause monitor.")
-            self.stop_auto_pause_event.clear()
-            self.auto_pause_thread = threading.Thread(target=self._monitor_external_audio, daemon=True)
-            self.auto_pause_thread.start()
-
-    def stop_auto_pause_monitor(self):
-        if self.auto_pause_thread and self.auto_pause_thread.is_alive():
-            logger.info("Deactivating auto-pause monitor.")
-            self.stop_auto_pause_event.set()
-
-    def set_auto_pause_enabled(self, enable):
-        try:
-            response = {'status': 'success'}
-            if enable:
-                if sys.platform == "win32" and not PYCAW_AVAILABLE:
-                    self.config['autoPauseOnExternalAudio'] = False
-                    config_handler.save_config(self.config)
-                    return {'status': 'error', 'message': "pycaw library not found. Auto-pause on Windows requires it."}
-                if sys.platform == "darwin": response = {'status': 'warning', 'message': 'Auto-pause on macOS has a 3-5 second delay and cannot identify the app playing audio.'}
-                elif sys.platform.startswith("linux"): response = {'status': 'warning', 'message': 'Auto-pause on Linux is experimental and may not work with all audio setups.'}
-            self.config['autoPauseOnExternalAudio'] = bool(enable)
-            config_handler.save_config(self.config)
-            if enable: self.start_auto_pause_monitor()
-            else: self.stop_auto_pause_monitor()
-            logger.info(f"Auto-pause feature set to enabled: {enable}")
-            return response
-        except Exception as e:
-            logger.error("Error setting auto-pause enabled state: %s", e, exc_info=True)
-            return {'status': 'error', 'message': str(e)}
-
-    def save_audio_proc_blacklist(self, blacklist):
-        """Saves the user-defined audio process blacklist."""
-        try:
-            if not isinstance(blacklist, list) or not all(isinstance(i, str) for i in blacklist):
-                return {'status': 'error', 'message': 'Invalid data format for blacklist.'}
-            self.config['autoPauseAudioProcBlacklist'] = blacklist
-            config_handler.save_config(self.config)
-            self.audio_proc_blacklist = [p.lower() for p in blacklist]
-            logger.info(f"Audio process blacklist updated: {blacklist}")
-            return {'status': 'success'}
-        except Exception as e:
-            logger.error("Error saving audio process blacklist: %s", e, exc_info=True)
-            return {'status': 'error', 'message': str(e)}
-            
-    # --- Discord Rich Presence ---
-    def _connect_to_discord(self):
-        """Worker function to connect to Discord RPC. Runs in a separate thread."""
-        try:
-            rpc_instance = pypresence.Presence(DISCORD_CLIENT_ID)
-            rpc_instance.connect()  # This is the blocking call.
-            self.rpc = rpc_instance # Assign to self.rpc only on successful connection.
-            logger.info("Discord Rich Presence connected.")
-        except Exception as e:
-            logger.warning(f"Could not connect to Discord Rich Presence: {e}")
-            self.rpc = None
-
-    def start_rich_presence(self):
-        """Starts the Discord Rich Presence connection in a background thread."""
-        if not PYPRESENCE_AVAILABLE:
-            return
-        # Check if already connected or a connection attempt is in progress.
-        if self.rpc or (self.rpc_thread and self.rpc_thread.is_alive()):
-            return
-
-        logger.info("Attempting to connect to Discord Rich Presence...")
-        self.rpc_thread = threading.Thread(target=self._connect_to_discord, daemon=True)
-        self.rpc_thread.start()
-
-    def stop_rich_presence(self):
-        if self.rpc:
-            try:
-                self.rpc.close()
-                logger.info("Discord Rich Presence disconnected.")
-            except Exception as e: logger.warning(f"Error while closing Discord Rich Presence: {e}")
-            finally: self.rpc = None
-
-    def set_discord_presence_enabled(self, enable):
-        try:
-            if enable and not PYPRESENCE_AVAILABLE:
-                self.config['discordRichPresence'] = False
-                config_handler.save_config(self.config)
-                return {'status': 'error', 'message': "pypresence library not found. Install it with: pip install pypresence"}
-            self.config['discordRichPresence'] = bool(enable)
-            config_handler.save_config(self.config)
-            if enable: self.start_rich_presence()
-            else: self.stop_rich_presence()
-            logger.info(f"Discord Rich Presence set to enabled: {enable}")
-            return {'status': 'success'}
-        except Exception as e:
-            logger.error("Error setting Discord Rich Presence state: %s", e, exc_info=True)
-            return {'status': 'error', 'message': str(e)}
-
-    def update_rich_presence(self, data):
-        if not self.rpc and self.config.get('discordRichPresence'): self.start_rich_presence()
-        if not self.rpc: return
-        try:
-            if data: self.rpc.update(**data)
-            else: self.rpc.clear()
-        except pypresence.exceptions.PipeClosed:
-            logger.warning("Discord pipe closed. Assuming Discord was closed.")
-            self.stop_rich_presence()
-        except Exception as e:
-            logger.error(f"Failed to update Discord Rich Presence: {e}", exc_info=True)
+import sys
+import os
+import threading
+import json
+import subprocess
+import re
+import logging
+
+import config_handler
+from python_utils import json_dumps
+
+logger = logging.getLogger(__name__)
+
+# Matches the application.process.binary / application.name properties in
+# `pactl list sink-inputs` output. One combined pattern so each block is
+# scanned once instead of once per property.
+_PACTL_PROP_RE = re.compile(r'^\s*application\.(process\.binary|name) = "(.*?)"', re.M)
+
+# The shutdown/idle broadcast is a constant; serialize it once.
+_IDLE_JS = "window.setExternalAudioState(" + json_dumps({'isActive': False, 'sources': []}) + ")"
+
+
+# The platform audio backends and pypresence are imported lazily on first use,
+# so users who keep auto-pause or Rich Presence disabled never pay the import
+# cost (on Windows, pycaw's COM typelib loading alone is tens of ms at startup).
+# None means "not resolved yet"; the _lazy_import_* helpers settle each flag.
+PYCAW_AVAILABLE = None
+PYCAW_CALLBACKS_AVAILABLE = False
+PULSECTL_AVAILABLE = None
+COREAUDIO_AVAILABLE = None
+PYPRESENCE_AVAILABLE = None
+DISCORD_CLIENT_ID = "1395848010004566186"
+
+def _lazy_import_pycaw():
+    """Imports pycaw/comtypes on first use; returns whether they are usable."""
+    global PYCAW_AVAILABLE, PYCAW_CALLBACKS_AVAILABLE
+    global AudioUtilities, CoInitialize, CoUninitialize, COMError
+    global _SessionEvents, _SessionCreatedNotification
+    if PYCAW_AVAILABLE is not None:
+        return PYCAW_AVAILABLE
+    try:
+        from pycaw.pycaw import AudioUtilities
+        from comtypes import CoInitialize, CoUninitialize, COMError
+        PYCAW_AVAILABLE = True
+    except (ImportError, OSError):
+        logger.warning("pycaw or its dependencies not found. Auto-pause feature will be disabled on Windows.")
+        PYCAW_AVAILABLE = False
+        return False
+    try:
+        # Event-driven session tracking (newer pycaw). When present the
+        # monitor reacts to session callbacks instead of polling every second.
+        from pycaw.callbacks import AudioSessionNotification, AudioSessionEvents
+        PYCAW_CALLBACKS_AVAILABLE = True
+    except (ImportError, OSError):
+        logger.info("pycaw.callbacks not available; Windows audio monitor will poll instead.")
+        return True
+
+    class _SessionEvents(AudioSessionEvents):
+        """Flags the monitor thread to rescan when a session's state or mute changes."""
+        def __init__(self, dirty_event):
+            super().__init__()
+            self.dirty_event = dirty_event
+
+        def on_state_changed(self, new_state, new_state_id):
+            self.dirty_event.set()
+
+        def on_simple_volume_changed(self, new_volume, new_mute, event_context):
+            self.dirty_event.set()
+
+    class _SessionCreatedNotification(AudioSessionNotification):
+        """Attaches event callbacks to newly created audio sessions."""
+        def __init__(self, dirty_event):
+            super().__init__()
+            self.dirty_event = dirty_event
+
+        def on_session_created(self, new_session):
+            try:
+                new_session.register_notification(_SessionEvents(self.dirty_event))
+            except Exception:
+                pass
+            self.dirty_event.set()
+
+    return True
+
+def _lazy_import_pulsectl():
+    """Imports the native PulseAudio/PipeWire client on first use."""
+    global PULSECTL_AVAILABLE, pulsectl
+    if PULSECTL_AVAILABLE is None:
+        try:
+            import pulsectl
+            PULSECTL_AVAILABLE = True
+        except (ImportError, OSError):
+            logger.info("pulsectl not available; Linux audio monitor will poll pactl instead.")
+            PULSECTL_AVAILABLE = False
+    return PULSECTL_AVAILABLE
+
+def _lazy_import_coreaudio():
+    """Imports pyobjc's CoreAudio bindings on first use."""
+    global COREAUDIO_AVAILABLE, CoreAudio
+    if COREAUDIO_AVAILABLE is None:
+        try:
+            import CoreAudio
+            COREAUDIO_AVAILABLE = True
+        except (ImportError, OSError):
+            logger.info("pyobjc CoreAudio not available; macOS audio monitor will poll system_profiler instead.")
+            COREAUDIO_AVAILABLE = False
+    return COREAUDIO_AVAILABLE
+
+def _lazy_import_pypresence():
+    """Imports pypresence on first use; returns whether it is usable."""
+    global PYPRESENCE_AVAILABLE, pypresence
+    if PYPRESENCE_AVAILABLE is None:
+        try:
+            import pypresence
+            PYPRESENCE_AVAILABLE = True
+        except ImportError:
+            logger.warning("pypresence not found. Discord Rich Presence will be disabled.")
+            PYPRESENCE_AVAILABLE = False
+        except Exception as e:
+            logger.warning(f"An unexpected error occurred while importing pypresence: {e}")
+            PYPRESENCE_AVAILABLE = False
+    return PYPRESENCE_AVAILABLE
+
+
+class BackgroundServices:
+    def __init__(self, config, window_manager, executor=None):
+        self.config = config
+        self.window_manager = window_manager
+        # Shared app executor; Discord connect attempts run on it instead of
+        # spawning a dedicated thread per reconnect.
+        self.executor = executor
+        
+        # Auto-pause state
+        self.auto_pause_thread = None
+        self.stop_auto_pause_event = threading.Event()
+        self.current_process_name = os.path.basename(sys.executable).lower()
+        # The app's own process plus the user blacklist, as one frozenset so
+        # the per-session check in the monitor loops is a single hash lookup.
+        self._ignore_procs = frozenset(
+            [self.current_process_name] + [p.lower() for p in self.config.get('autoPauseAudioProcBlacklist', [])]
+        )
+
+        # Last setExternalAudioState call sent to the frontend, for dedup.
+        self._last_audio_js = None
+
+        # Discord Rich Presence state
+        self.rpc = None
+        self.rpc_thread = None
+        self._rpc_future = None
+
+    def start(self):
+        """Starts all enabled background services."""
+        if self.config.get('autoPauseOnExternalAudio'):
+            self.start_auto_pause_monitor()
+        if self.config.get('discordRichPresence'):
+            self.start_rich_presence()
+
+    def shutdown(self):
+        """Stops all running background services."""
+        self.stop_auto_pause_monitor()
+        self.stop_rich_presence()
+
+    # --- Auto-pause logic ---
+    def _monitor_external_audio(self):
+        if sys.platform == "win32":
+            if not _lazy_import_pycaw():
+                logger.warning("pycaw unavailable; Windows auto-pause monitor not started.")
+                return
+            self._monitor_audio_windows()
+        elif sys.platform.startswith("linux"): self._monitor_audio_linux()
+        elif sys.platform == "darwin": self._monitor_audio_macos()
+        else: logger.warning(f"Auto-pause is not supported on this platform ({sys.platform}).")
+
+    # Safety resync interval for the event-driven monitors: even with no
+    # callbacks firing, audio state is re-checked this often.
+    EVENT_RESYNC_INTERVAL = 30
+
+
+    def _maybe_broadcast(self, payload):
+        """
+        Broadcasts the external-audio payload to the frontend, skipping exact
+        repeats so unchanged state never crosses the JS bridge. Returns False
+        when the bridge is unusable and the monitor should stop.
+        """
+        js = f"window.setExternalAudioState({json_dumps(payload)})"
+        if js == self._last_audio_js:
+            return True
+        try:
+            self.window_manager.broadcast_js(js)
+        except Exception as e:
+            logger.error(f"Could not communicate with frontend to set audio state: {e}")
+            return False
+        self._last_audio_js = js
+        return True
+
+    def _scan_windows_sessions(self, sessions):
+        """Checks a list of audio sessions for active, unmuted external audio."""
+        is_external_audio_active, active_sources = False, set()
+        for session in sessions:
+            if not (session.Process and session.State == 1): continue
+            try:
+                # The original GetPeakValue() method can be unreliable on systems with
+                # certain audio drivers or enhancement software. This revised logic
+                # first checks the process name against the app itself and the blacklist.
+                # Then, it checks if the session is simply active and unmuted, which is
+                # more reliable, though potentially less precise (more false positives).
+                # This brings Windows behavior more in line with other platforms.
+                process_name_full = session.Process.name()
+                process_name_lower = process_name_full.lower()
+                if process_name_lower in self._ignore_procs: continue
+
+                if not session.SimpleAudioVolume.GetMute():
+                    is_external_audio_active = True
+                    active_sources.add(process_name_full)
+            except (COMError, AttributeError, ValueError):
+                # Some sessions may not have all properties (e.g., Process.name(), GetMute()).
+                # It's safe to just skip them.
+                pass
+        return is_external_audio_active, active_sources
+
+    def _monitor_audio_windows(self):
+        if PYCAW_CALLBACKS_AVAILABLE:
+            self._monitor_audio_windows_events()
+        else:
+            self._monitor_audio_windows_polling()
+
+    def _monitor_audio_windows_events(self):
+        """
+        Event-driven Windows monitor: audio session callbacks flag a rescan,
+        so the thread sleeps instead of re-enumerating sessions every second.
+        """
+        logger.info("Starting event-driven external audio monitor thread for Windows...")
+        CoInitialize()
+        last_state = False
+        dirty = threading.Event()
+        dirty.set()  # Force an initial scan.
+        registered_sessions = []  # Keep references so registrations aren't GC'd.
+        try:
+            try:
+                session_manager = AudioUtilities.GetAudioSessionManager()
+                session_manager.RegisterSessionNotification(_SessionCreatedNotification(dirty))
+                # The creation notification only fires once the enumerator has
+                # been requested at least once.
+                session_manager.GetSessionEnumerator()
+                for session in AudioUtilities.GetAllSessions():
+                    try:
+                        session.register_notification(_SessionEvents(dirty))
+                        registered_sessions.append(session)
+                    except Exception:
+                        pass
+            except Exception as e:
+                logger.warning(f"Could not register audio session callbacks ({e}); falling back to polling.")
+                CoUninitialize()
+                self._monitor_audio_windows_polling()
+                return
+            while not self.stop_auto_pause_event.is_set():
+                dirty.wait(self.EVENT_RESYNC_INTERVAL)
+                dirty.clear()
+                if self.stop_auto_pause_event.is_set(): break
+                try:
+                    is_external_audio_active, active_sources = self._scan_windows_sessions(AudioUtilities.GetAllSessions())
+                except Exception as e:
+                    logger.error(f"Unhandled exception in Windows audio session check: {e}", exc_info=True)
+                    self.stop_auto_pause_event.wait(5)
+                    continue
+                if is_external_audio_active != last_state:
+                    logger.info(f"External audio {'DETECTED' if is_external_audio_active else 'stopped'}. Sources: {sorted(active_sources)}")
+                    last_state = is_external_audio_active
+                if not self._maybe_broadcast({'isActive': is_external_audio_active, 'sources': sorted(active_sources)}):
+                    break
+        finally:
+            for session in registered_sessions:
+                try: session.unregister_notification()
+                except Exception: pass
+            try:
+                self.window_manager.broadcast_js(_IDLE_JS)
+            except: pass
+            CoUninitialize()
+            logger.info("External audio monitor thread for Windows stopped.")
+
+    def _monitor_audio_windows_polling(self):
+        logger.info("Starting external audio monitor thread for Windows...")
+        CoInitialize()
+        last_state = False
+        try:
+            while not self.stop_auto_pause_event.is_set():
+                try:
+                    is_external_audio_active, active_sources = self._scan_windows_sessions(AudioUtilities.GetAllSessions())
+                except Exception as e:
+                    logger.error(f"Unhandled exception in Windows audio session check: {e}", exc_info=True)
+                    self.stop_auto_pause_event.wait(5)
+                    continue
+                if is_external_audio_active != last_state:
+                    logger.info(f"External audio {'DETECTED' if is_external_audio_active else 'stopped'}. Sources: {sorted(active_sources)}")
+                    last_state = is_external_audio_active
+                if not self._maybe_broadcast({'isActive': is_external_audio_active, 'sources': sorted(active_sources)}):
+                    break
+                self.stop_auto_pause_event.wait(1)
+        finally:
+            try:
+                self.window_manager.broadcast_js(_IDLE_JS)
+            except: pass
+            CoUninitialize()
+            logger.info("External audio monitor thread for Windows stopped.")
+
+    def _monitor_audio_linux(self):
+        if _lazy_import_pulsectl():
+            try:
+                self._monitor_audio_linux_pulsectl()
+                return
+            except Exception as e:
+                logger.warning(f"pulsectl audio monitor failed ({e}); falling back to pactl polling.")
+                if self.stop_auto_pause_event.is_set():
+                    return
+        self._monitor_audio_linux_pactl()
+
+    def _monitor_audio_linux_pulsectl(self):
+        """
+        Event-driven Linux monitor: subscribes to sink-input events on the
+        PulseAudio/PipeWire socket, so sessions are only re-read when one is
+        created, changed or removed — no pactl forks and no text parsing.
+        """
+        logger.info("Starting external audio monitor thread for Linux (pulsectl)...")
+        last_state = False
+
+        def on_event(ev):
+            # Any sink-input event invalidates our view; stop the listen loop
+            # so the outer loop rescans. Pulse calls aren't allowed in here.
+            raise pulsectl.PulseLoopStop
+
+        try:
+            with pulsectl.Pulse('fnote-audio-monitor') as pulse:
+                pulse.event_mask_set('sink_input')
+                pulse.event_callback_set(on_event)
+                while not self.stop_auto_pause_event.is_set():
+                    is_external_audio_active, active_sources = False, []
+                    for sink_input in pulse.sink_input_list():
+                        if sink_input.mute or getattr(sink_input, 'corked', False):
+                            continue
+                        props = sink_input.proplist
+                        app_binary = (props.get('application.process.binary') or '').lower()
+                        if not app_binary or app_binary in self._ignore_procs:
+                            continue
+                        is_external_audio_active = True
+                        app_name = props.get('application.name') or app_binary
+                        if app_name not in active_sources:
+                            active_sources.append(app_name)
+                    if is_external_audio_active != last_state:
+                        logger.info(f"External audio {'DETECTED' if is_external_audio_active else 'stopped'}. Sources: {active_sources}")
+                        last_state = is_external_audio_active
+                    if not self._maybe_broadcast({'isActive': is_external_audio_active, 'sources': active_sources}):
+                        break
+                    # Blocks until a sink-input event fires; the timeout only
+                    # bounds how long shutdown can take to be noticed.
+                    pulse.event_listen(timeout=1.0)
+        finally:
+            try:
+                self.window_manager.broadcast_js(_IDLE_JS)
+            except: pass
+            logger.info("External audio monitor thread for Linux stopped.")
+
+    def _check_pactl_block(self, block, active_sources):
+        """Returns True if a pactl sink-input block is an external, running source."""
+        if not block.strip():
+            return False
+        if not ('State: RUNNING' in block and 'Mute: yes' not in block and 'Corked: yes' not in block):
+            return False
+        app_binary, app_name = None, None
+        for match in _PACTL_PROP_RE.finditer(block):
+            if match.group(1) == 'process.binary':
+                app_binary = match.group(2).lower()
+            else:
+                app_name = match.group(2)
+        if not app_binary or app_binary in self._ignore_procs:
+            return False
+        app_name = app_name or app_binary
+        if app_name not in active_sources:
+            active_sources.append(app_name)
+        return True
+
+    def _monitor_audio_linux_pactl(self):
+        logger.info("Starting external audio monitor thread for Linux (pactl)...")
+        last_state = False
+        try:
+            while not self.stop_auto_pause_event.is_set():
+                is_external_audio_active, active_sources = False, []
+                try:
+                    # Stream pactl's stdout block by block instead of buffering
+                    # it whole, and stop reading as soon as one external
+                    # running source is found.
+                    proc = subprocess.Popen(['pactl', 'list', 'sink-inputs'],
+                                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+                    timeout_timer = threading.Timer(3, proc.kill)
+                    timeout_timer.start()
+                    try:
+                        block_lines = []
+                        for line in proc.stdout:
+                            if line.startswith('Sink Input #'):
+                                if self._check_pactl_block(''.join(block_lines), active_sources):
+                                    is_external_audio_active = True
+                                    break
+                                block_lines = []
+                            else:
+                                block_lines.append(line)
+                        if not is_external_audio_active and self._check_pactl_block(''.join(block_lines), active_sources):
+                            is_external_audio_active = True
+                    finally:
+                        timeout_timer.cancel()
+                        proc.kill()
+                        proc.stdout.close()
+                        proc.wait()
+                except FileNotFoundError:
+                    logger.warning("`pactl` command not found. Auto-pause on Linux requires PulseAudio or PipeWire with the pactl utility.")
+                    break
+                except Exception as e:
+                    logger.error(f"Unhandled exception in Linux audio check: {e}", exc_info=True)
+                    self.stop_auto_pause_event.wait(5)
+                    continue
+                if is_external_audio_active != last_state:
+                    logger.info(f"External audio {'DETECTED' if is_external_audio_active else 'stopped'}. Sources: {active_sources}")
+                    last_state = is_external_audio_active
+                if not self._maybe_broadcast({'isActive': is_external_audio_active, 'sources': active_sources}):
+                    break
+                self.stop_auto_pause_event.wait(2)
+        finally:
+            try:
+                self.window_manager.broadcast_js(_IDLE_JS)
+            except: pass
+            logger.info("External audio monitor thread for Linux stopped.")
+
+    def _monitor_audio_macos(self):
+        if _lazy_import_coreaudio():
+            try:
+                self._monitor_audio_macos_coreaudio()
+                return
+            except Exception as e:
+                logger.warning(f"CoreAudio audio monitor failed ({e}); falling back to system_profiler polling.")
+                if self.stop_auto_pause_event.is_set():
+                    return
+        self._monitor_audio_macos_profiler()
+
+    def _monitor_audio_macos_coreaudio(self):
+        """
+        Event-driven macOS monitor: a CoreAudio property listener on the default
+        output device fires when audio starts or stops anywhere on the device,
+        so the thread only reads one UInt32 property on change instead of
+        forking system_profiler and parsing its JSON every 3 seconds.
+        """
+        logger.info("Starting external audio monitor thread for macOS (CoreAudio)...")
+        last_state = False
+        dirty = threading.Event()
+        dirty.set()  # Force an initial check.
+
+        def _property_address(selector):
+            return CoreAudio.AudioObjectPropertyAddress(
+                mSelector=selector,
+                mScope=CoreAudio.kAudioObjectPropertyScopeGlobal,
+                mElement=CoreAudio.kAudioObjectPropertyElementMaster,
+            )
+
+        def _read_uint32(object_id, address):
+            _, data = CoreAudio.AudioObjectGetPropertyData(object_id, address, 0, None, 4, None)
+            return int.from_bytes(data[:4], sys.byteorder)
+
+        device_address = _property_address(CoreAudio.kAudioHardwarePropertyDefaultOutputDevice)
+        device_id = _read_uint32(CoreAudio.kAudioObjectSystemObject, device_address)
+        running_address = _property_address(CoreAudio.kAudioDevicePropertyDeviceIsRunningSomewhere)
+
+        def on_property_changed(object_id, addresses):
+            dirty.set()
+            return 0
+
+        CoreAudio.AudioObjectAddPropertyListener(device_id, running_address, on_property_changed, None)
+        try:
+            while not self.stop_auto_pause_event.is_set():
+                dirty.wait(self.EVENT_RESYNC_INTERVAL)
+                dirty.clear()
+                if self.stop_auto_pause_event.is_set(): break
+                is_external_audio_active = bool(_read_uint32(device_id, running_address))
+                if is_external_audio_active != last_state:
+                    logger.info(f"External audio {'DETECTED' if is_external_audio_active else 'stopped'}.")
+                    last_state = is_external_audio_active
+                if not self._maybe_broadcast({'isActive': is_external_audio_active, 'sources': ["Another Application"] if is_external_audio_active else []}):
+                    break
+        finally:
+            try: CoreAudio.AudioObjectRemovePropertyListener(device_id, running_address, on_property_changed, None)
+            except Exception: pass
+            try:
+                self.window_manager.broadcast_js(_IDLE_JS)
+            except: pass
+            logger.info("External audio monitor thread for macOS stopped.")
+
+    def _monitor_audio_macos_profiler(self):
+        logger.info("Starting external audio monitor thread for macOS (system_profiler)...")
+        last_state = False
+        try:
+            while not self.stop_auto_pause_event.is_set():
+                is_external_audio_active, active_sources = False, []
+                try:
+                    raw = subprocess.run(['system_profiler', 'SPAudioDataType', '-json'], capture_output=True, check=True, timeout=5).stdout
+                    # All we need is one boolean, so a C-speed byte scan beats
+                    # decoding and parsing the full JSON into nested dicts.
+                    # system_profiler pads its separators with spaces.
+                    if b'"spaudio_output_running" : "Yes"' in raw or b'"spaudio_output_running": "Yes"' in raw:
+                        is_external_audio_active = True
+                        active_sources = ["Another Application"]
+                except (FileNotFoundError, subprocess.TimeoutExpired, KeyError): pass
+                except Exception as e:
+                    logger.error(f"Unhandled exception in macOS audio check: {e}", exc_info=True)
+                    self.stop_auto_pause_event.wait(5)
+                    continue
+                if is_external_audio_active != last_state:
+                    logger.info(f"External audio {'DETECTED' if is_external_audio_active else 'stopped'}.")
+                    last_state = is_external_audio_active
+                if not self._maybe_broadcast({'isActive': is_external_audio_active, 'sources': active_sources}):
+                    break
+                self.stop_auto_pause_event.wait(3)
+        finally:
+            try:
+                self.window_manager.broadcast_js(_IDLE_JS)
+            except: pass
+            logger.info("External audio monitor thread for macOS stopped.")
+
+    def start_auto_pause_monitor(self):
+        if self.auto_pause_thread is None or not self.auto_pause_thread.is_alive():
+            logger.info("Activating auto-pause monitor.")
+            self.stop_auto_pause_event.clear()
+            self._last_audio_js = None
+            self.auto_pause_thread = threading.Thread(target=self._monitor_external_audio, daemon=True)
+            self.auto_pause_thread.start()
+
+    def stop_auto_pause_monitor(self):
+        if self.auto_pause_thread and self.auto_pause_thread.is_alive():
+            logger.info("Deactivating auto-pause monitor.")
+            self.stop_auto_pause_event.set()
+
+    def set_auto_pause_enabled(self, enable):
+        try:
+            response = {'status': 'success'}
+            if enable:
+                if sys.platform == "win32" and not _lazy_import_pycaw():
+                    self.config['autoPauseOnExternalAudio'] = False
+                    config_handler.save_config(self.config)
+                    return {'status': 'error', 'message': "pycaw library not found. Auto-pause on Windows requires it."}
+                if sys.platform == "darwin": response = {'status': 'warning', 'message': 'Auto-pause on macOS has a 3-5 second delay and cannot identify the app playing audio.'}
+                elif sys.platform.startswith("linux"): response = {'status': 'warning', 'message': 'Auto-pause on Linux is experimental and may not work with all audio setups.'}
+            self.config['autoPauseOnExternalAudio'] = bool(enable)
+            config_handler.save_config(self.config)
+            if enable: self.start_auto_pause_monitor()
+            else: self.stop_auto_pause_monitor()
+            logger.info(f"Auto-pause feature set to enabled: {enable}")
+            return response
+        except Exception as e:
+            logger.error("Error setting auto-pause enabled state: %s", e, exc_info=True)
+            return {'status': 'error', 'message': str(e)}
+
+    def save_audio_proc_blacklist(self, blacklist):
+        """Saves the user-defined audio process blacklist."""
+        try:
+            if not isinstance(blacklist, list) or not all(isinstance(i, str) for i in blacklist):
+                return {'status': 'error', 'message': 'Invalid data format for blacklist.'}
+            self.config['autoPauseAudioProcBlacklist'] = blacklist
+            config_handler.save_config(self.config)
+            self._ignore_procs = frozenset([self.current_process_name] + [p.lower() for p in blacklist])
+            logger.info(f"Audio process blacklist updated: {blacklist}")
+            return {'status': 'success'}
+        except Exception as e:
+            logger.error("Error saving audio process blacklist: %s", e, exc_info=True)
+            return {'status': 'error', 'message': str(e)}
+            
+    # --- Discord Rich Presence ---
+    def _connect_to_discord(self):
+        """Worker function to connect to Discord RPC. Runs off the caller's thread."""
+        try:
+            rpc_instance = pypresence.Presence(DISCORD_CLIENT_ID)
+            rpc_instance.connect()  # This is the blocking call.
+            self.rpc = rpc_instance # Assign to self.rpc only on successful connection.
+            logger.info("Discord Rich Presence connected.")
+        except Exception as e:
+            logger.warning(f"Could not connect to Discord Rich Presence: {e}")
+            self.rpc = None
+
+    def start_rich_presence(self):
+        """Starts the Discord Rich Presence connection in the background."""
+        if not _lazy_import_pypresence():
+            return
+        # Check if already connected or a connection attempt is in progress.
+        if self.rpc:
+            return
+        if self._rpc_future is not None and not self._rpc_future.done():
+            return
+        if self.rpc_thread and self.rpc_thread.is_alive():
+            return
+
+        logger.info("Attempting to connect to Discord Rich Presence...")
+        if self.executor is not None:
+            # Reuse a shared worker instead of spawning a thread per attempt;
+            # reconnects are retried on every presence update while enabled.
+            self._rpc_future = self.executor.submit(self._connect_to_discord)
+        else:
+            self.rpc_thread = threading.Thread(target=self._connect_to_discord, daemon=True)
+            self.rpc_thread.start()
+
+    def stop_rich_presence(self):
+        if self.rpc:
+            try:
+                self.rpc.close()
+                logger.info("Discord Rich Presence disconnected.")
+            except Exception as e: logger.warning(f"Error while closing Discord Rich Presence: {e}")
+            finally: self.rpc = None
+
+    def set_discord_presence_enabled(self, enable):
+        try:
+            if enable and not _lazy_import_pypresence():
+                self.config['discordRichPresence'] = False
+                config_handler.save_config(self.config)
+                return {'status': 'error', 'message': "pypresence library not found. Install it with: pip install pypresence"}
+            self.config['discordRichPresence'] = bool(enable)
+            config_handler.save_config(self.config)
+            if enable: self.start_rich_presence()
+            else: self.stop_rich_presence()
+            logger.info(f"Discord Rich Presence set to enabled: {enable}")
+            return {'status': 'success'}
+        except Exception as e:
+            logger.error("Error setting Discord Rich Presence state: %s", e, exc_info=True)
+            return {'status': 'error', 'message': str(e)}
+
+    def update_rich_presence(self, data):
+        if not self.rpc and self.config.get('discordRichPresence'): self.start_rich_presence()
+        if not self.rpc: return
+        try:
+            if data: self.rpc.update(**data)
+            else: self.rpc.clear()
+        except pypresence.exceptions.PipeClosed:
+            logger.warning("Discord pipe closed. Assuming Discord was closed.")
+            self.stop_rich_presence()
+        except Exception as e:
+            logger.error(f"Failed to update Discord Rich Presence: {e}", exc_info=True)
             self.stop_rich_presence()
\ No newline at end of file
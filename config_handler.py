@@ -1,85 +1,184 @@
-import json
-import os
-import logging
-from python_utils import APP_DATA_DIR
-
-logger = logging.getLogger(__name__)
-CONFIG_FILE = os.path.join(APP_DATA_DIR, 'FConf.json')
-
-def get_default_config():
-    """Returns the default configuration dictionary."""
-    return {
-        'volume': 100,
-        'loopMode': 'none',
-        'isShuffling': False,
-        'activePlaylist': 'Default',
-        'sidebarWidth': 300,
-        'playlistSectionHeight': 150,
-        'lastPlayedSongPath': None,
-        'lastPlayedTime': 0,
-        'lastPlayedPlaylist': 'Default',
-        'toastDuration': 3,
-        'runOnStartup': False,
-        'resumeOnStartup': False,
-        'autoPauseOnExternalAudio': False,
-        'discordRichPresence': False,
-        'autoPauseAudioProcBlacklist': [
-            'fxsound.exe',
-            'msedgewebview2.exe',
-            'obs64.exe',
-            'obs32.exe',
-            'lively.exe',
-            'wallpaper64.exe',
-            'wallpaper32.exe',
-            'voicemeeter.exe',
-            'voicemeeterpro.exe',
-            'voicemeeterpotato.exe',
-            'soundlock.exe',
-            'nvcontainer.exe',
-            'audiodg.exe',
-            'ShellExperienceHost.exe'
-        ],
-        'windowWidth': 1150,
-        'windowHeight': 750,
-        'windowX': None,
-        'windowY': None
-    }
-
-def load_config():
-    """
-    Loads configuration from FConf.json.
-    If the file doesn't exist or is invalid, it returns the default configuration.
-    """
-    default_config = get_default_config()
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                loaded_conf = json.load(f)
-                # Merge loaded config into defaults to ensure all keys are present
-                default_config.update(loaded_conf)
-                logger.info("Configuration loaded from FConf.json")
-        except (json.JSONDecodeError, IOError) as e:
-            logger.warning(f"Could not load config file '{CONFIG_FILE}'. Using defaults. Error: {e}")
-    else:
-        logger.info("No config file found. Using default configuration.")
-    return default_config
-
-def save_config(config_data):
-    """
-    Saves the provided configuration dictionary to FConf.json.
-    
-    Args:
-        config_data (dict): The configuration dictionary to save.
-    """
-    try:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, indent=4)
-        logger.debug("Configuration saved to FConf.json")
-    except IOError as e:
-        logger.error(f"Could not save config file '{CONFIG_FILE}'. Error: {e}")
-
-def ensure_config_exists():
-    """Ensures the config file exists, creating it with defaults if not."""
-    if not os.path.exists(CONFIG_FILE):
-        logger.info(f"Config file '{CONFIG_FILE}' not found. Creating with default values.")
-        save_config(get_default_config())
\ No newline at end of file
+import atexit
+import json
+import os
+import threading
+import logging
+from python_utils import APP_DATA_DIR
+
+# orjson parses and serializes several times faster than the stdlib encoder;
+# load_config sits on the startup critical path, so use it when installed.
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+logger = logging.getLogger(__name__)
+CONFIG_FILE = os.path.join(APP_DATA_DIR, 'FConf.json')
+
+# In-process cache of the parsed config, keyed on the file's mtime, so
+# repeat load_config calls skip the disk read and parse entirely.
+_cache = {'mtime': None, 'data': None}
+
+# Writes are coalesced: save_config stores the dict and arms a short timer,
+# so a slider drag producing dozens of calls results in one atomic write.
+_SAVE_DELAY = 0.5
+_save_lock = threading.Lock()
+_pending = None
+_save_timer = None
+_last_written = None
+_last_bytes = None  # Serialized form of the last write, for byte-level skips.
+
+# Compact output: indentation pushes the stdlib encoder off its C fast path
+# and roughly doubles the bytes written, and FConf.json isn't hand-edited.
+if _orjson is not None:
+    def _loads(data):
+        return _orjson.loads(data)
+
+    def _dumps(config_data):
+        return _orjson.dumps(config_data)
+else:
+    def _loads(data):
+        return json.loads(data)
+
+    def _dumps(config_data):
+        return json.dumps(config_data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+# Built once at import; get_default_config hands out shallow copies. The
+# blacklist is a tuple so the copy never has to clone a list.
+_DEFAULTS = {
+    'volume': 100,
+    'loopMode': 'none',
+    'isShuffling': False,
+    'activePlaylist': 'Default',
+    'sidebarWidth': 300,
+    'playlistSectionHeight': 150,
+    'lastPlayedSongPath': None,
+    'lastPlayedTime': 0,
+    'lastPlayedPlaylist': 'Default',
+    'toastDuration': 3,
+    'runOnStartup': False,
+    'resumeOnStartup': False,
+    'autoPauseOnExternalAudio': False,
+    'discordRichPresence': False,
+    'autoPauseAudioProcBlacklist': (
+        'fxsound.exe',
+        'msedgewebview2.exe',
+        'obs64.exe',
+        'obs32.exe',
+        'lively.exe',
+        'wallpaper64.exe',
+        'wallpaper32.exe',
+        'voicemeeter.exe',
+        'voicemeeterpro.exe',
+        'voicemeeterpotato.exe',
+        'soundlock.exe',
+        'nvcontainer.exe',
+        'audiodg.exe',
+        'ShellExperienceHost.exe'
+    ),
+    'windowWidth': 1150,
+    'windowHeight': 750,
+    'windowX': None,
+    'windowY': None
+}
+
+def get_default_config():
+    """Returns the default configuration dictionary."""
+    # The blacklist is the one nested structure; rebuild it as a list so
+    # callers that mutate it can't touch the shared template.
+    return {**_DEFAULTS, 'autoPauseAudioProcBlacklist': list(_DEFAULTS['autoPauseAudioProcBlacklist'])}
+
+def _with_defaults(loaded_conf):
+    """Returns a config dict with any missing keys filled from the defaults.
+
+    When the file already has every key — the common case — this is one
+    shallow copy with no defaults merge at all.
+    """
+    if loaded_conf.keys() >= _DEFAULTS.keys():
+        return dict(loaded_conf)
+    return {**_DEFAULTS, **loaded_conf}
+
+def load_config():
+    """
+    Loads configuration from FConf.json.
+    If the file doesn't exist or is invalid, it returns the default configuration.
+    """
+    try:
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns
+    except OSError:
+        logger.info("No config file found. Using default configuration.")
+        return get_default_config()
+
+    if mtime == _cache['mtime']:
+        # Copy so callers can mutate their dict without corrupting the cache.
+        return _with_defaults(_cache['data'])
+
+    try:
+        with open(CONFIG_FILE, 'rb') as f:
+            loaded_conf = _loads(f.read())
+        _cache['mtime'], _cache['data'] = mtime, loaded_conf
+        logger.info("Configuration loaded from FConf.json")
+        return _with_defaults(loaded_conf)
+    except (ValueError, IOError) as e:
+        logger.warning("Could not load config file '%s'. Using defaults. Error: %s", CONFIG_FILE, e)
+        return get_default_config()
+
+def save_config(config_data):
+    """
+    Saves the provided configuration dictionary to FConf.json.
+
+    Writes are debounced: calls within a short window coalesce into one
+    atomic write, and a save matching what is already on disk is dropped.
+    The pending write is flushed at interpreter exit.
+
+    Args:
+        config_data (dict): The configuration dictionary to save.
+    """
+    global _pending, _save_timer
+    with _save_lock:
+        if _pending is None and config_data == _last_written:
+            return
+        _pending = dict(config_data)
+        if _save_timer is None:
+            _save_timer = threading.Timer(_SAVE_DELAY, _flush)
+            _save_timer.daemon = True
+            _save_timer.start()
+
+def _flush():
+    """Writes any pending config to disk via an atomic rename."""
+    global _pending, _save_timer, _last_written, _last_bytes
+    with _save_lock:
+        _save_timer = None
+        config_data, _pending = _pending, None
+    if config_data is None or config_data == _last_written:
+        return
+    buf = _dumps(config_data)
+    if buf == _last_bytes:
+        # Different dict objects can serialize to identical JSON (e.g. a
+        # value restored to its old state); skip the write and the SSD wear.
+        _last_written = config_data
+        return
+    tmp_file = CONFIG_FILE + '.tmp'
+    try:
+        with open(tmp_file, 'wb') as f:
+            f.write(buf)
+        os.replace(tmp_file, CONFIG_FILE)
+        _last_written = config_data
+        _last_bytes = buf
+        _cache['mtime'], _cache['data'] = os.stat(CONFIG_FILE).st_mtime_ns, config_data
+        logger.debug("Configuration saved to FConf.json")
+    except (IOError, OSError) as e:
+        logger.error("Could not save config file '%s'. Error: %s", CONFIG_FILE, e)
+
+atexit.register(_flush)
+
+def ensure_config_exists():
+    """Ensures the config file exists, creating it with defaults if not."""
+    try:
+        # O_EXCL tests and creates in one syscall; no exists-then-open race.
+        fd = os.open(CONFIG_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        return
+    logger.info("Config file '%s' not found. Creating with default values.", CONFIG_FILE)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(_dumps(get_default_config()))
\ No newline at end of file
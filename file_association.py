@@ -1,6 +1,7 @@
 import sys
 import os
 import logging
+from functools import cached_property
 from python_utils import resource_path
 
 logger = logging.getLogger(__name__)
@@ -31,22 +32,28 @@ class FileAssociationHandler:
         self.is_frozen = getattr(sys, 'frozen', False)
         self.ext = ".fnlist"
         self.file_type_desc = "FNote Playlist"
+        self.executable_path = sys.executable
 
+    # The command and icon strings involve path resolution and a stat; they
+    # are computed lazily so the macOS/Linux handlers, whose register() never
+    # touches them, do no filesystem work at startup.
+    @cached_property
+    def command(self):
         if self.is_frozen:
             # Running as a bundled app (e.g., PyInstaller executable)
-            self.executable_path = sys.executable
-            self.command = f'"{self.executable_path}" "%1"'
-            self.icon_path = f'"{self.executable_path}",0'
-        else:
-            # Running as a Python script
-            # Base the path on the main script being run, not this specific file.
-            self.script_path = os.path.abspath(sys.argv[0])
-            self.executable_path = sys.executable
-            self.command = f'"{self.executable_path}" "{self.script_path}" "%1"'
-            
-            # Use resource_path for consistency to find assets from the project root.
-            icon_file = resource_path('favicon.ico')
-            self.icon_path = f'"{icon_file}"' if os.path.exists(icon_file) else f'"{self.executable_path}",0'
+            return f'"{self.executable_path}" "%1"'
+        # Running as a Python script: base the path on the main script being
+        # run, not this specific file.
+        script_path = os.path.abspath(sys.argv[0])
+        return f'"{self.executable_path}" "{script_path}" "%1"'
+
+    @cached_property
+    def icon_path(self):
+        if self.is_frozen:
+            return f'"{self.executable_path}",0'
+        # Use resource_path for consistency to find assets from the project root.
+        icon_file = resource_path('favicon.ico')
+        return f'"{icon_file}"' if os.path.exists(icon_file) else f'"{self.executable_path}",0'
 
     def register(self):
         """Registers the .fnlist file type with the application."""
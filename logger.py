@@ -1,7 +1,10 @@
+import atexit
 import logging
 import os
+import queue
 import sys
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from python_utils import APP_DATA_DIR
 
 # New log directory
@@ -12,14 +15,16 @@ def setup_logging():
     """Configures logging for the entire application to a timestamped file and the console."""
     try:
         os.makedirs(LOG_DIR, exist_ok=True)
-        
+
         # --- Log file rotation based on file count ---
-        log_files = sorted(
-            [os.path.join(LOG_DIR, f) for f in os.listdir(LOG_DIR) if f.endswith('.log')],
-            key=os.path.getmtime
-        )
+        # scandir caches each entry's stat result from the directory read,
+        # avoiding a separate getmtime stat() syscall per log file.
+        with os.scandir(LOG_DIR) as it:
+            log_files = sorted(
+                (e.stat().st_mtime, e.path) for e in it if e.name.endswith('.log')
+            )
         while len(log_files) >= MAX_LOG_FILES:
-            oldest_log = log_files.pop(0)
+            _, oldest_log = log_files.pop(0)
             os.remove(oldest_log)
             
     except OSError as e:
@@ -51,16 +56,22 @@ def setup_logging():
     # Get the root logger and set up handlers
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.INFO)
-    
+
     # Clear any existing handlers to prevent duplicates if setup_logging is called multiple times
     if root_logger.hasHandlers():
         root_logger.handlers.clear()
-        
-    root_logger.addHandler(console_handler)
-    
+
+    # Route records through a queue so formatting and file/console writes
+    # happen on a background listener thread instead of blocking the caller.
+    handlers = [console_handler]
     # Add file handler only if it was successfully created
     if 'file_handler' in locals():
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    root_logger.addHandler(QueueHandler(log_queue))
 
     logging.info("="*20 + " FNote Logging Started " + "="*20)
     logging.info(f"Log file for this session: {log_file_path}")
\ No newline at end of file
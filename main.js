@@ -709,6 +709,24 @@ window.addEventListener('pywebviewready', () => {
         State.updateSong({ path, accentColor: color });
     };
 
+    window.updateSongCover = (path, coverPath, coverData) => {
+        if (coverData) {
+            State.setCoverInCache(path, coverData);
+        }
+        State.updateSong({ path, coverPath, accentColor: null });
+        UI.showToast('Cover updated successfully.', 'success');
+    };
+
+    window.showToastFromBackend = (message, type = 'info') => {
+        UI.showToast(message, type);
+    };
+
+    window.updateSongAccentColorsBatch = (updates) => {
+        for (const { path, color } of updates) {
+            State.updateSong({ path, accentColor: color });
+        }
+    };
+
     window.completeAccentRefresh = (message, isError = false) => {
         Progress.close();
         UI.showGlobalStatus(message, { isActive: false, isError });
@@ -744,6 +762,9 @@ window.addEventListener('pywebviewready', () => {
 
     // --- New Progress API for Python ---
     window.progress_start = (title, items) => {
+        // Batched updates may reference items by index instead of
+        // re-sending full id strings; keep the id table from this call.
+        window.__progressIds = items.map(it => it.id);
         Progress.open(title, items);
         UI.showGlobalStatus(title, {
             isActive: true,
@@ -761,6 +782,25 @@ window.addEventListener('pywebviewready', () => {
         });
     };
 
+    window.progress_update_batch = (updates) => {
+        // One bridge crossing carries many per-item updates; the global
+        // status line only needs the latest counter, not one per item.
+        for (const u of updates) {
+            // A numeric id is an index into the progress_start item list.
+            const id = typeof u.id === 'number' ? window.__progressIds[u.id] : u.id;
+            if (u.color) State.updateSong({ path: id, accentColor: u.color });
+            Progress.update(id, u.status, u.msg);
+        }
+        const last = updates[updates.length - 1];
+        if (last) {
+            UI.showGlobalStatus(DOM.progressModalTitle.textContent, {
+                isActive: true,
+                summary: `${last.i} / ${last.total}`,
+                onDetailsClick: () => DOM.progressModal.classList.add('visible')
+            });
+        }
+    };
+
     window.progress_finish = (message, isError) => {
         Progress.close();
         UI.showGlobalStatus(message, { isActive: false, isError: isError });
@@ -1,540 +1,763 @@
-import os
-import shutil
-import base64
-import colorsys
-import subprocess
-import sys
-import webbrowser
-import requests
-import json
-import tempfile
-import zipfile
-import stat
-import threading
-import numpy as np
-import mutagen
-import logging
-from mutagen.mp3 import MP3
-from mutagen.flac import FLAC
-from mutagen.m4a import M4A
-from mutagen.id3 import APIC
-from mutagen.mp4 import MP4Cover
-from PIL import Image
-from contextlib import contextmanager
-
-import python_utils as utils
-from python_utils import YT_DLP_UPDATE_URL
-
-SONGS_DIR = os.path.join(utils.APP_DATA_DIR, 'songs')
-
-logger = logging.getLogger(__name__)
-
-def _vectorized_rgb_to_hsv(rgb):
-    """
-    Converts an array of RGB values to HSV using NumPy for vectorization.
-    Input: rgb is a NumPy array of shape (n, 3) with values in [0, 1].
-    Output: hsv is a NumPy array of shape (n, 3) with values in [0, 1].
-    """
-    eps = 1e-7 # Epsilon to prevent division by zero
-    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
-    maxc, minc = np.maximum(np.maximum(r, g), b), np.minimum(np.minimum(r, g), b)
-    v, delta = maxc, maxc - minc
-    s = np.where(maxc > eps, delta / maxc, 0)
-    h = np.zeros_like(v)
-    rc, gc, bc = (maxc - r) / (delta + eps), (maxc - g) / (delta + eps), (maxc - b) / (delta + eps)
-    idx_r, idx_g, idx_b = (r == maxc), (g == maxc) & ~idx_r, (b == maxc) & ~idx_r & ~idx_g
-    h[idx_r], h[idx_g], h[idx_b] = bc[idx_r] - gc[idx_r], 2.0 + rc[idx_g] - bc[idx_g], 4.0 + gc[idx_b] - rc[idx_b]
-    h = (h / 6.0) % 1.0
-    h[delta < eps] = 0
-    return np.stack((h, s, v), axis=-1)
-
-class MediaManager:
-    """Handles file system operations, metadata extraction, and media processing."""
-
-    def __init__(self, db_handler, executor, window_manager):
-        self.db_handler = db_handler
-        self.executor = executor
-        self.window_manager = window_manager
-        self.ffmpeg_path = self._find_ffmpeg()
-        self.has_ffmpeg = self.ffmpeg_path is not None
-        self.bin_dir = os.path.join(utils.APP_DATA_DIR, 'bin')
-        self.yt_dlp_path = self._get_yt_dlp_path()
-        self._ensure_yt_dlp_exists()
-        
-        self.long_task_lock = threading.Lock()
-        self.active_task_name = None
-
-    def _get_yt_dlp_path(self):
-        """Determines the platform-specific path for the yt-dlp executable."""
-        if sys.platform == "win32": return os.path.join(self.bin_dir, 'yt-dlp.exe')
-        return os.path.join(self.bin_dir, 'yt-dlp')
-
-    def _ensure_yt_dlp_exists(self):
-        """Checks for the yt-dlp executable and downloads it if it's missing."""
-        if not os.path.exists(self.yt_dlp_path):
-            logger.info("yt-dlp not found. Attempting to download the latest version...")
-            try: self.update_yt_dlp_executable()
-            except Exception as e: logger.error(f"FATAL: Could not download yt-dlp. URL downloads will fail. Error: {e}")
-
-    def get_yt_dlp_version(self):
-        """Returns the version of the local yt-dlp executable."""
-        if not os.path.exists(self.yt_dlp_path): return "Not Found"
-        try:
-            # Add creationflags on Windows to suppress the console window
-            startupinfo = None
-            if sys.platform == "win32":
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                startupinfo.wShowWindow = subprocess.SW_HIDE
-
-            result = subprocess.run(
-                [self.yt_dlp_path, '--version'],
-                capture_output=True,
-                text=True,
-                check=True,
-                startupinfo=startupinfo  # Pass the new info here
-            )
-            return result.stdout.strip()
-        except (subprocess.CalledProcessError, FileNotFoundError): return "Error"
-
-    def update_yt_dlp_executable(self):
-        """Downloads the latest yt-dlp executable from GitHub atomically."""
-        logger.info("Fetching latest yt-dlp release information...")
-        response = requests.get(YT_DLP_UPDATE_URL, timeout=10)
-        response.raise_for_status()
-        assets, asset_name = response.json().get('assets', []), 'yt-dlp'
-        if sys.platform == "win32": asset_name = 'yt-dlp.exe'
-        elif sys.platform == "darwin": asset_name = 'yt-dlp_macos'
-        asset_url = next((asset['browser_download_url'] for asset in assets if asset['name'] == asset_name), None)
-        if not asset_url: raise Exception(f"Could not find a download link for '{asset_name}'.")
-
-        os.makedirs(self.bin_dir, exist_ok=True)
-        
-        # Download to a temporary file in the same directory to ensure atomic move/rename
-        temp_file_path = None
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, dir=self.bin_dir, suffix='.tmp') as temp_file:
-                temp_file_path = temp_file.name
-                logger.info(f"Downloading {asset_name} to temporary file {temp_file_path}...")
-                with requests.get(asset_url, stream=True, timeout=30) as r:
-                    r.raise_for_status()
-                    for chunk in r.iter_content(chunk_size=8192):
-                        temp_file.write(chunk)
-            
-            # If download is successful, make it executable and move it to the final destination
-            if sys.platform != "win32":
-                os.chmod(temp_file_path, os.stat(temp_file_path).st_mode | stat.S_IEXEC)
-            
-            shutil.move(temp_file_path, self.yt_dlp_path)
-            logger.info("yt-dlp has been successfully downloaded/updated.")
-            return {'status': 'success'}
-
-        except Exception as e:
-            # Clean up the temporary file on error
-            if temp_file_path and os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-            raise e # Re-raise the exception to be handled by the caller
-
-    def setup_songs_directory(self):
-        os.makedirs(SONGS_DIR, exist_ok=True)
-
-    def _find_ffmpeg(self):
-        """
-        Finds the ffmpeg executable, prioritizing a bundled version when frozen.
-        Logs the search process in detail.
-        """
-        logger.info("Searching for FFmpeg executable...")
-        # Priority 1: Bundled FFmpeg (when running as a PyInstaller executable)
-        if getattr(sys, 'frozen', False):
-            logger.info("Running as a frozen executable. Prioritizing bundled FFmpeg.")
-            exe_name = 'ffmpeg.exe' if sys.platform == 'win32' else 'ffmpeg'
-            
-            # PyInstaller places binaries from the .spec file's `binaries` list
-            # into an `_internal` subdirectory relative to the main executable.
-            base_dir = os.path.dirname(sys.executable)
-            bundled_path = os.path.join(base_dir, '_internal', exe_name)
-            
-            logger.info(f"Checking for bundled FFmpeg at: {bundled_path}")
-            if os.path.exists(bundled_path):
-                logger.info(f"SUCCESS: Using bundled FFmpeg found at: {bundled_path}")
-                return bundled_path
-            else:
-                logger.warning("Bundled FFmpeg not found at the expected location. Falling back to system PATH.")
-        else:
-            logger.info("Running as a script. Bundled FFmpeg check is skipped. Searching system PATH.")
-        
-        # Priority 2: FFmpeg in system PATH (fallback)
-        system_path = shutil.which('ffmpeg')
-        if system_path:
-            logger.info(f"SUCCESS: Using system FFmpeg found in PATH: {system_path}")
-            return system_path
-        
-        logger.warning("FFmpeg not found. URL downloads will not be available.")
-        return None
-
-    # --- METADATA AND FILE PROCESSING (UNCHANGED) ---
-    def _extract_metadata_from_file(self, filepath):
-        name, artist, cover_path = None, None, None
-        base_name, _ = os.path.splitext(os.path.basename(filepath))
-        try:
-            audio_easy = mutagen.File(filepath, easy=True)
-            if audio_easy:
-                name, artist = audio_easy.get('title', [None])[0], audio_easy.get('artist', [None])[0]
-            if not name:
-                parsed_artist, parsed_name = utils.parse_artist_title(os.path.basename(filepath))
-                name = parsed_name
-                if not artist: artist = parsed_artist
-            audio = mutagen.File(filepath)
-            if not audio: raise ValueError("Mutagen could not parse the file.")
-            cover_data, ext = None, None
-            if isinstance(audio, MP3) and 'APIC:' in audio.tags:
-                artwork = audio.tags['APIC:']
-                cover_data, ext = artwork.data, 'png' if 'png' in artwork.mime else 'jpg'
-            elif isinstance(audio, FLAC) and audio.pictures:
-                artwork = audio.pictures[0]
-                cover_data, ext = artwork.data, 'png' if 'png' in artwork.mime else 'jpg'
-            elif isinstance(audio, M4A) and 'covr' in audio.tags and audio.tags['covr']:
-                artwork = audio.tags['covr'][0]
-                cover_data, ext = artwork, 'png' if artwork.imageformat == MP4Cover.FORMAT_PNG else 'jpg'
-            if cover_data:
-                saved_cover_path = os.path.join(SONGS_DIR, f"{base_name}_cover.{ext}")
-                with open(saved_cover_path, 'wb') as f: f.write(cover_data)
-                cover_path = utils.to_web_path(saved_cover_path)
-        except Exception as e:
-            logger.error(f"Error processing metadata for {filepath}: {e}")
-            if not name:
-                parsed_artist, parsed_name = utils.parse_artist_title(os.path.basename(filepath))
-                name, artist = parsed_name, parsed_artist
-        return {'name': name, 'artist': artist, 'cover_path': cover_path}
-    def write_metadata_to_file(self, web_path, details):
-        filepath = utils.web_to_os_path(web_path)
-        audio = mutagen.File(filepath, easy=True)
-        if not audio: return
-        if details.get('name'): audio['title'] = details['name']
-        if details.get('artist'): audio['artist'] = details['artist']
-        audio.save()
-    def embed_cover_in_file(self, web_audio_path, web_cover_path):
-        audio_path, cover_path = utils.web_to_os_path(web_audio_path), utils.web_to_os_path(web_cover_path)
-        with open(cover_path, 'rb') as f: cover_data = f.read()
-        mime_type = 'image/jpeg' if cover_path.lower().endswith(('.jpg', '.jpeg')) else 'image/png'
-        audio = mutagen.File(audio_path)
-        if not audio: return
-        if isinstance(audio, MP3):
-            audio = MP3(audio_path)
-            audio.tags.add(APIC(encoding=3, mime=mime_type, type=3, desc=u'Cover', data=cover_data))
-        elif isinstance(audio, FLAC):
-            pic = mutagen.flac.Picture()
-            pic.data, pic.mime, pic.type = cover_data, mime_type, 3
-            audio.clear_pictures()
-            audio.add_picture(pic)
-        elif isinstance(audio, M4A):
-            fmt = MP4Cover.FORMAT_JPEG if mime_type == 'image/jpeg' else MP4Cover.FORMAT_PNG
-            audio['covr'] = [MP4Cover(cover_data, imageformat=fmt)]
-        audio.save()
-    def generate_accent_color(self, cover_os_path):
-        try:
-            with Image.open(cover_os_path) as img:
-                pixels_rgb = np.array(img.resize((64, 64), Image.Resampling.LANCZOS).convert("RGB"), dtype=np.float32) / 255.0
-            pixels_rgb = pixels_rgb.reshape(-1, 3)
-            pixels_hsv = _vectorized_rgb_to_hsv(pixels_rgb)
-            h, s, v = pixels_hsv[:, 0], pixels_hsv[:, 1], pixels_hsv[:, 2]
-            saturation_mask = s > 0.20
-            weights = s * np.maximum(0, 1 - np.abs(v - 0.75) * 2)
-            weights[~saturation_mask] = 0
-            hue_indices = (h * 36).astype(int) % 36
-            if np.isclose(np.sum(weights), 0):
-                luminance = np.dot(pixels_rgb, [0.2126, 0.7152, 0.0722])
-                c = 200 if np.mean(luminance) * 255 < 100 else 80
-                return {'r': c, 'g': c, 'b': c}
-            hue_bin_weights = np.bincount(hue_indices, weights=weights, minlength=36)
-            s_in_bins = np.bincount(hue_indices, weights=s * weights, minlength=36)
-            v_in_bins = np.bincount(hue_indices, weights=v * weights, minlength=36)
-            dominant_hue_index = np.argmax(hue_bin_weights)
-            dominant_bin_weight = hue_bin_weights[dominant_hue_index]
-            avg_s, avg_v = s_in_bins[dominant_hue_index] / dominant_bin_weight, v_in_bins[dominant_hue_index] / dominant_bin_weight
-            final_s, final_v = min(1.0, avg_s * 1.2), min(1.0, max(0.6, avg_v))
-            dominant_hue_deg = (dominant_hue_index / 36.0) * 360.0
-            r, g, b = colorsys.hsv_to_rgb(dominant_hue_deg / 360.0, final_s, final_v)
-            return {'r': int(r*255), 'g': int(g*255), 'b': int(b*255)}
-        except Exception as e:
-            logger.error(f"Error generating accent color for {cover_os_path}: {e}")
-            return {'r': 150, 'g': 150, 'b': 150}
-    def get_cover_data(self, cover_os_path):
-        if not cover_os_path or not os.path.exists(cover_os_path): return None
-        image_format = os.path.splitext(cover_os_path)[1].lstrip('.').lower()
-        if image_format == 'jpg': image_format = 'jpeg'
-        with open(cover_os_path, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-            return f"data:image/{image_format};base64,{encoded_string}"
-    def get_import_candidates_from_files(self, file_paths):
-        all_candidates, titles_to_check = [], []
-        for src_path in file_paths:
-            metadata = self._extract_metadata_from_file(src_path)
-            title = metadata.get('name') or os.path.splitext(os.path.basename(src_path))[0]
-            all_candidates.append({'source_path': src_path, 'title': title, 'artist': metadata.get('artist'), 'is_duplicate': False})
-            if title: titles_to_check.append(title)
-        if titles_to_check:
-            existing_titles_set = self.db_handler.get_existing_titles(titles_to_check)
-            for candidate in all_candidates:
-                if candidate['title'] and candidate['title'].lower() in existing_titles_set:
-                    candidate['is_duplicate'] = True
-        return all_candidates
-    def finalize_import_from_files(self, file_paths):
-        newly_added_songs = []
-        for src_path in file_paths:
-            filename = os.path.basename(src_path)
-            count, final_filename, dest_os_path = 1, filename, os.path.join(SONGS_DIR, filename)
-            while os.path.exists(dest_os_path):
-                base, ext = os.path.splitext(filename)
-                final_filename = f"{base}_{count}{ext}"
-                dest_os_path = os.path.join(SONGS_DIR, final_filename)
-                count += 1
-            shutil.copy2(src_path, dest_os_path)
-            metadata = self._extract_metadata_from_file(dest_os_path)
-            song_obj = {"name": metadata['name'], "artist": metadata['artist'], "path": utils.to_web_path(dest_os_path), "coverPath": metadata['cover_path'], "isMissing": False, "tagIds": []}
-            newly_added_songs.append(song_obj)
-        return newly_added_songs
-    def _parse_ydl_error(self, error_string):
-        err_lower = error_string.lower()
-        if 'unsupported url' in err_lower: return "The provided URL is not supported."
-        if 'unavailable' in err_lower: return "This video is unavailable."
-        if 'private' in err_lower: return "This video is private."
-        if 'age-restricted' in err_lower: return "This video is age-restricted."
-        if 'no such file or directory' in err_lower and 'ffmpeg' in err_lower: return "FFmpeg is not installed or not in PATH."
-        return error_string.split('ERROR:')[-1].strip()
-    def fetch_url_metadata(self, url):
-        if not os.path.exists(self.yt_dlp_path): return {'status': 'error', 'message': 'yt-dlp is not installed. Please update it in Settings.'}
-        try:
-            command = [self.yt_dlp_path, '--flat-playlist', '--ignore-errors', '--dump-json', url]
-            result = subprocess.run(command, capture_output=True, text=True, check=True, encoding='utf-8')
-            lines, first_info = result.stdout.strip().split('\n'), json.loads(result.stdout.strip().split('\n')[0])
-            entries = [json.loads(line) for line in lines] if 'entries' in first_info else [first_info]
-            playlist_title = first_info.get('title', 'Playlist' if 'entries' in first_info else 'Single Video')
-            all_titles = [entry.get('title', 'Untitled') for entry in entries]
-            existing_titles_set = self.db_handler.get_existing_titles(all_titles)
-            valid_entries = []
-            for entry in entries:
-                title = entry.get('title', 'Untitled')
-                is_unavailable = title in ('[Deleted video]', '[Private video]')
-                valid_entries.append({'title': title, 'is_duplicate': (title.lower() in existing_titles_set) and not is_unavailable, 'is_unavailable': is_unavailable})
-            if not valid_entries: return {'status': 'error', 'message': 'No valid videos found.'}
-            return {'status': 'success', 'playlist_title': playlist_title, 'entries': valid_entries}
-        except subprocess.CalledProcessError as e: return {'status': 'error', 'message': self._parse_ydl_error(e.stderr or e.stdout)}
-        except Exception as e: return {'status': 'error', 'message': self._parse_ydl_error(str(e))}
-    @contextmanager
-    def download_single_from_url(self, url):
-        if not os.path.exists(self.yt_dlp_path): raise Exception("yt-dlp is not installed. Please update it in Settings.")
-        with tempfile.TemporaryDirectory() as temp_dir:
-            command = [
-                self.yt_dlp_path, '--format', 'bestaudio/best', 
-                '-o', os.path.join(temp_dir, '%(title)s.%(ext)s'), 
-                '--extract-audio', '--audio-format', 'mp3', 
-                '--audio-quality', '192K', '--write-thumbnail', 
-                '--no-playlist', '--ignore-errors'
-            ]
-            if self.has_ffmpeg:
-                command.extend(['--ffmpeg-location', self.ffmpeg_path])
-            
-            command.append(url)
-
-            try:
-                subprocess.run(command, check=True, capture_output=True, text=True, encoding='utf-8')
-                yield temp_dir
-            except subprocess.CalledProcessError as e: raise Exception(self._parse_ydl_error(e.stderr or e.stdout)) from e
-    def get_ydl_info(self, url, temp_dir):
-        downloaded_files = [f for f in os.listdir(temp_dir) if f.endswith('.mp3')]
-        if not downloaded_files: raise Exception("No MP3 file found in download directory.")
-        temp_audio_path = os.path.join(temp_dir, downloaded_files[0])
-        command = [self.yt_dlp_path, '--skip-download', '--dump-json', url]
-        result = subprocess.run(command, capture_output=True, text=True, check=True, encoding='utf-8')
-        info_dict = json.loads(result.stdout)
-        info_dict['requested_downloads'] = [{'filepath': temp_audio_path}]
-        return info_dict
-    def _process_ydl_entry(self, entry_info, temp_dir):
-        if not entry_info or 'requested_downloads' not in entry_info or not entry_info['requested_downloads']: return None
-        temp_audio_path = entry_info['requested_downloads'][0]['filepath']
-        if not os.path.exists(temp_audio_path): return None
-        original_filename = os.path.basename(temp_audio_path)
-        base, ext = os.path.splitext(original_filename)
-        final_filename, dest_os_path, count = original_filename, os.path.join(SONGS_DIR, original_filename), 1
-        while os.path.exists(dest_os_path):
-            final_filename = f"{base}_{count}{ext}"
-            dest_os_path = os.path.join(SONGS_DIR, final_filename)
-            count += 1
-        shutil.move(temp_audio_path, dest_os_path)
-        web_audio_path = utils.to_web_path(dest_os_path)
-        song_name, song_artist = entry_info.get('title'), entry_info.get('artist') or entry_info.get('uploader')
-        temp_audio_basename, _ = os.path.splitext(os.path.basename(temp_audio_path))
-        temp_cover_path = next((os.path.join(temp_dir, f) for f in os.listdir(temp_dir) if f.startswith(temp_audio_basename) and f.lower().endswith(('.webp', '.jpg', '.jpeg', '.png'))), None)
-        web_cover_path = None
-        if temp_cover_path:
-            final_audio_basename, cover_ext = os.path.splitext(final_filename)[0], os.path.splitext(temp_cover_path)[1]
-            new_cover_filename = f"{final_audio_basename}_cover{cover_ext}"
-            dest_cover_os_path = os.path.join(SONGS_DIR, new_cover_filename)
-            shutil.move(temp_cover_path, dest_cover_os_path)
-            web_cover_path = utils.to_web_path(dest_cover_os_path)
-        try:
-            self.write_metadata_to_file(web_audio_path, {'name': song_name, 'artist': song_artist})
-            if web_cover_path: self.embed_cover_in_file(web_audio_path, web_cover_path)
-        except Exception as e: logger.error(f"Could not write metadata for downloaded file {dest_os_path}: {e}")
-        return {"name": song_name, "artist": song_artist, "path": web_audio_path, "coverPath": web_cover_path, "isMissing": False, "tagIds": []}
-    def delete_files(self, file_paths):
-        for file_path in file_paths:
-            if file_path and os.path.exists(file_path):
-                try: os.remove(file_path)
-                except OSError as e: logger.error(f"Could not remove file {file_path}: {e}")
-    def show_in_explorer(self, web_path):
-        os_path = utils.web_to_os_path(web_path)
-        if not os.path.exists(os_path): return {'status': 'error', 'message': 'File not found.'}
-        absolute_path = os.path.abspath(os_path)
-        if sys.platform == "win32": subprocess.Popen(['explorer', '/select,', absolute_path])
-        elif sys.platform == "darwin": subprocess.Popen(['open', '-R', absolute_path])
-        else: subprocess.Popen(['xdg-open', os.path.dirname(absolute_path)])
-        return {'status': 'success'}
-    def open_external_link(self, url): webbrowser.open(url)
-    def export_playlist(self, playlist_name, save_path):
-        export_data = self.db_handler.get_playlist_data_for_export(playlist_name)
-        with tempfile.TemporaryDirectory() as temp_dir:
-            with open(os.path.join(temp_dir, 'playlist_data.json'), 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, indent=4)
-            for song in export_data['songs']:
-                if song.get('path'):
-                    src_song_path = utils.web_to_os_path(song['path'])
-                    if os.path.exists(src_song_path): shutil.copy2(src_song_path, os.path.join(temp_dir, os.path.basename(src_song_path)))
-                if song.get('coverPath'):
-                    src_cover_path = utils.web_to_os_path(song['coverPath'])
-                    if os.path.exists(src_cover_path): shutil.copy2(src_cover_path, os.path.join(temp_dir, os.path.basename(src_cover_path)))
-            archive_base_path = os.path.splitext(save_path)[0]
-            shutil.make_archive(archive_base_path, 'zip', temp_dir)
-            if os.path.exists(save_path): os.remove(save_path)
-            shutil.move(f'{archive_base_path}.zip', save_path)
-    def export_playlist_as_m3u(self, playlist_name, save_path):
-        song_web_paths = self.db_handler.get_song_paths_for_playlist(playlist_name)
-        absolute_os_paths = [os.path.abspath(utils.web_to_os_path(p)) for p in song_web_paths]
-        with open(save_path, 'w', encoding='utf-8') as f:
-            f.write("#EXTM3U\n")
-            for path in absolute_os_paths: f.write(path + "\n")
-    def import_playlist(self, fnlist_path):
-        if not zipfile.is_zipfile(fnlist_path): raise ValueError("Invalid file format. Not a .fnlist archive.")
-        with tempfile.TemporaryDirectory() as temp_dir:
-            with zipfile.ZipFile(fnlist_path, 'r') as archive:
-                if 'playlist_data.json' not in archive.namelist(): raise ValueError("Invalid archive. 'playlist_data.json' manifest not found.")
-                archive.extractall(temp_dir)
-            with open(os.path.join(temp_dir, 'playlist_data.json'), 'r', encoding='utf-8') as f: manifest = json.load(f)
-            all_playlist_names = self.db_handler.get_all_playlist_names()
-            original_playlist_name = manifest['name']
-            final_playlist_name = original_playlist_name
-            count = 1
-            while final_playlist_name in all_playlist_names:
-                final_playlist_name = f"{original_playlist_name} ({count})"
-                count += 1
-            all_song_files = os.listdir(SONGS_DIR)
-            for song in manifest['songs']:
-                original_song_filename, final_song_filename, count = os.path.basename(song['path']), os.path.basename(song['path']), 1
-                while final_song_filename in all_song_files:
-                    base, ext = os.path.splitext(original_song_filename)
-                    final_song_filename = f"{base}_{count}{ext}"
-                    count += 1
-                shutil.copy2(os.path.join(temp_dir, original_song_filename), os.path.join(SONGS_DIR, final_song_filename))
-                song['path'] = utils.to_web_path(os.path.join(SONGS_DIR, final_song_filename))
-                if song.get('coverPath'):
-                    original_cover_filename, final_cover_filename, count = os.path.basename(song['coverPath']), os.path.basename(song['coverPath']), 1
-                    while final_cover_filename in all_song_files:
-                        base, ext = os.path.splitext(original_cover_filename)
-                        final_cover_filename = f"{base}_{count}{ext}"
-                        count += 1
-                    shutil.copy2(os.path.join(temp_dir, original_cover_filename), os.path.join(SONGS_DIR, final_cover_filename))
-                    song['coverPath'] = utils.to_web_path(os.path.join(SONGS_DIR, final_cover_filename))
-            new_playlist = self.db_handler.import_playlist_from_data(manifest, final_playlist_name)
-            return new_playlist
-
-    # --- DOWNLOAD WORKER (MOVED FROM song_api.py) ---
-    def _background_download_worker(self, entries_to_download, url_for_fallback):
-        newly_added_songs, total = [], len(entries_to_download)
-        for i, entry in enumerate(entries_to_download):
-            entry_id = str(entry.get('id', f"item_{i}")).replace("'", "").replace('"', "")
-            entry_title = entry.get('title', 'Untitled')
-            entry_url = entry.get('webpage_url', entry.get('url', url_for_fallback))
-            try:
-                self.window_manager.broadcast_js(f"window.progress_update('{entry_id}', 'working', 'Downloading...', {i + 1}, {total})")
-                with self.download_single_from_url(entry_url) as temp_dir:
-                    info_dict = self.get_ydl_info(entry_url, temp_dir)
-                    processed_song = self._process_ydl_entry(info_dict, temp_dir)
-                    if processed_song:
-                        newly_added_songs.append(processed_song)
-                        self.window_manager.broadcast_js(f"window.progress_update('{entry_id}', 'success', 'Done', {i + 1}, {total})")
-                    else: raise Exception("File processing failed after download.")
-            except Exception as e:
-                error_message = str(e).replace("'", "\\'").replace('"', '\\"')
-                self.window_manager.broadcast_js(f"window.progress_update('{entry_id}', 'error', '{error_message}', {i + 1}, {total})")
-        return newly_added_songs
-    def _on_url_download_complete(self, future):
-        try:
-            newly_added = future.result()
-            if newly_added:
-                self.window_manager.broadcast_js(f"window.completeUrlDownload({json.dumps({'status': 'success', 'songs': newly_added})})")
-                self.window_manager.broadcast_js(f"window.progress_finish('Download complete. {len(newly_added)} song(s) added.', false)")
-            else: self.window_manager.broadcast_js("window.progress_finish('Download finished. No new songs were added.', false, true)")
-        except Exception as e:
-            error_message = str(e).replace("'", "\\'").replace('"', '\\"')
-            self.window_manager.broadcast_js(f"window.progress_finish('Download failed: {error_message}', true)")
-        finally:
-            self.active_task_name = None
-            self.long_task_lock.release()
-    def start_url_download(self, url, indices=None):
-        if not self.long_task_lock.acquire(blocking=False): return {'status': 'error', 'message': f'Another task ({self.active_task_name}) is already in progress.'}
-        try:
-            command = [self.yt_dlp_path, '--flat-playlist', '--ignore-errors', '--dump-json', url]
-            result = subprocess.run(command, capture_output=True, text=True, check=True, encoding='utf-8')
-            lines, info = result.stdout.strip().split('\n'), json.loads(result.stdout.strip().split('\n')[0])
-            all_entries = [json.loads(line) for line in lines] if 'entries' in info else [info]
-            entries_to_download = [all_entries[i-1] for i in indices if 0 < i <= len(all_entries)] if indices else all_entries
-            if not entries_to_download:
-                self.long_task_lock.release()
-                return {'status': 'error', 'message': 'No items selected for download.'}
-            progress_items = [{'id': str(entry.get('id', f'item_{i}')).replace("'", "").replace('"', ""), 'name': entry.get('title', 'Untitled')} for i, entry in enumerate(entries_to_download)]
-            title = f"Downloading from {info.get('title', 'URL')}"
-            self.window_manager.broadcast_js(f"window.progress_start({json.dumps(title)}, {json.dumps(progress_items)})")
-            self.active_task_name = f"Downloading from {info.get('title', 'URL')}"
-            future = self.executor.submit(self._background_download_worker, entries_to_download, url)
-            future.add_done_callback(self._on_url_download_complete)
-            return {'status': 'processing'}
-        except Exception as e:
-            self.active_task_name = None
-            self.long_task_lock.release()
-            return {'status': 'error', 'message': str(e)}
-
-    # --- REFRESH ACCENTS WORKER (MOVED FROM song_api.py) ---
-    def _background_refresh_accents(self):
-        try:
-            all_songs_with_covers = self.db_handler.get_all_songs_with_covers()
-            total = len(all_songs_with_covers)
-            if total == 0:
-                self.window_manager.broadcast_js("window.completeAccentRefresh('No songs with covers to refresh.', false)")
-                return
-            progress_items = [{'id': song['path'], 'name': os.path.basename(song['path'])} for song in all_songs_with_covers]
-            self.window_manager.broadcast_js(f"window.progress_start('Refreshing Accent Colors', {json.dumps(progress_items)})")
-            for i, song in enumerate(all_songs_with_covers):
-                song_path = song['path'].replace("'", "\\'")
-                try:
-                    self.window_manager.broadcast_js(f"window.progress_update('{song_path}', 'working', '', {i + 1}, {total})")
-                    new_color = self.generate_accent_color(utils.web_to_os_path(song['cover_path']))
-                    if new_color:
-                        self.db_handler.save_song_color(song['path'], new_color)
-                        self.window_manager.broadcast_js(f"window.updateSongAccentColor({json.dumps(song['path'])}, {json.dumps(new_color)})")
-                    self.window_manager.broadcast_js(f"window.progress_update('{song_path}', 'success', 'Done', {i + 1}, {total})")
-                except Exception as e:
-                    error_msg = str(e).replace("'", "\\'").replace('"', '\\"')
-                    self.window_manager.broadcast_js(f"window.progress_update('{song_path}', 'error', '{error_msg}', {i + 1}, {total})")
-            self.window_manager.broadcast_js("window.completeAccentRefresh('Accent refresh complete!', false)")
-        except Exception as e:
-            error_message = json.dumps(f"An error occurred: {e}")
-            self.window_manager.broadcast_js(f"window.completeAccentRefresh({error_message}, true)")
-        finally:
-            self.active_task_name = None
-            self.long_task_lock.release()
-    def refresh_all_accent_colors(self):
-        if not self.long_task_lock.acquire(blocking=False): return {'status': 'error', 'message': f'Another task ({self.active_task_name}) is already in progress.'}
-        self.active_task_name = "Refreshing Accent Colors"
-        self.executor.submit(self._background_refresh_accents)
+import os
+import shutil
+import base64
+import colorsys
+import concurrent.futures
+import subprocess
+import sys
+import webbrowser
+import requests
+import json
+import tempfile
+import zipfile
+import stat
+import threading
+import time
+import numpy as np
+import mutagen
+import logging
+from mutagen.mp3 import MP3
+from mutagen.flac import FLAC
+from mutagen.m4a import M4A
+from mutagen.id3 import APIC
+from mutagen.mp4 import MP4Cover
+from PIL import Image
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+
+import python_utils as utils
+from python_utils import YT_DLP_UPDATE_URL
+
+SONGS_DIR = os.path.join(utils.APP_DATA_DIR, 'songs')
+
+logger = logging.getLogger(__name__)
+
+# Installed by app.py: called with the OS paths about to be unlinked so the
+# url_loader's cached file bodies and memory mappings are dropped first. On
+# Windows a live mapping holds a sharing lock that makes os.remove fail, so
+# a played song would otherwise leak on disk after deletion.
+_file_cache_evictor = None
+
+def set_file_cache_evictor(evictor):
+    """Registers the callable that drops served-file caches for OS paths."""
+    global _file_cache_evictor
+    _file_cache_evictor = evictor
+
+def _evict_served_caches(file_paths):
+    if _file_cache_evictor is not None:
+        try:
+            _file_cache_evictor(file_paths)
+        except Exception as e:
+            logger.error(f"Could not evict served-file caches: {e}", exc_info=True)
+
+def _accent_hue_bins(hsv_u8):
+    """
+    Hue-bin accumulation for accent colors over a Pillow 'HSV'-mode array.
+
+    Input: hsv_u8 is a uint8 NumPy array of shape (n, 3) as produced by
+    Image.convert('HSV') — the RGB-to-HSV branch work happens in Pillow's C
+    converter, not in Python. Returns (hue_weights, s_weights, v_weights),
+    each of length 36, where a pixel's weight favors saturated
+    mid-brightness colors; the three accumulations share a single bincount.
+    """
+    # Desaturated pixels carry zero weight, so drop them before any float
+    # math; on typical album art this shrinks every downstream array. The
+    # 0.20 cutoff is applied on the raw uint8 channel to keep the mask cheap.
+    mask = hsv_u8[:, 1] > 51  # 0.20 * 255
+    if not mask.any():
+        zeros = np.zeros(36)
+        return zeros, zeros, zeros
+    kept = hsv_u8[mask]
+    s = kept[:, 1].astype(np.float32) / 255.0
+    v = kept[:, 2].astype(np.float32) / 255.0
+    weights = s * np.maximum(0, 1 - np.abs(v - 0.75) * 2)
+    # Pillow scales hue to 0..255; map straight onto the 36 bins.
+    hue_indices = kept[:, 0].astype(np.intp) * 36 // 256
+    # One bincount over three offset copies of the bins instead of three
+    # separate scans. The index and weight vectors are written into
+    # preallocated buffers so the two weighted products never exist as
+    # standalone temporaries.
+    n = hue_indices.shape[0]
+    idx = np.empty(3 * n, dtype=np.intp)
+    idx[:n] = hue_indices
+    np.add(hue_indices, 36, out=idx[n:2 * n])
+    np.add(hue_indices, 72, out=idx[2 * n:])
+    w = np.empty(3 * n, dtype=np.float32)
+    w[:n] = weights
+    np.multiply(s, weights, out=w[n:2 * n])
+    np.multiply(v, weights, out=w[2 * n:])
+    binned = np.bincount(idx, weights=w, minlength=108)
+    return binned[:36], binned[36:72], binned[72:108]
+
+@lru_cache(maxsize=1)
+def _find_ffmpeg():
+    """
+    Finds the ffmpeg executable, prioritizing a bundled version when frozen.
+    Logs the search process in detail.
+
+    The result only depends on sys.frozen, sys.executable and sys.platform —
+    all fixed for the life of the process — so it is memoized and the PATH
+    scan runs at most once, however many MediaManager instances are built.
+    """
+    logger.info("Searching for FFmpeg executable...")
+    # Priority 1: Bundled FFmpeg (when running as a PyInstaller executable)
+    if getattr(sys, 'frozen', False):
+        logger.info("Running as a frozen executable. Prioritizing bundled FFmpeg.")
+        exe_name = 'ffmpeg.exe' if sys.platform == 'win32' else 'ffmpeg'
+
+        # PyInstaller places binaries from the .spec file's `binaries` list
+        # into an `_internal` subdirectory relative to the main executable.
+        base_dir = os.path.dirname(sys.executable)
+        bundled_path = os.path.join(base_dir, '_internal', exe_name)
+
+        logger.info(f"Checking for bundled FFmpeg at: {bundled_path}")
+        if os.path.exists(bundled_path):
+            logger.info(f"SUCCESS: Using bundled FFmpeg found at: {bundled_path}")
+            return bundled_path
+        else:
+            logger.warning("Bundled FFmpeg not found at the expected location. Falling back to system PATH.")
+    else:
+        logger.info("Running as a script. Bundled FFmpeg check is skipped. Searching system PATH.")
+
+    # Priority 2: FFmpeg in system PATH (fallback)
+    system_path = shutil.which('ffmpeg')
+    if system_path:
+        logger.info(f"SUCCESS: Using system FFmpeg found in PATH: {system_path}")
+        return system_path
+
+    logger.warning("FFmpeg not found. URL downloads will not be available.")
+    return None
+
+class MediaManager:
+    """Handles file system operations, metadata extraction, and media processing."""
+
+    def __init__(self, db_handler, executor, window_manager):
+        self.db_handler = db_handler
+        self.executor = executor
+        self.window_manager = window_manager
+        self.ffmpeg_path = _find_ffmpeg()
+        self.has_ffmpeg = self.ffmpeg_path is not None
+        self.bin_dir = os.path.join(utils.APP_DATA_DIR, 'bin')
+        self.yt_dlp_path = self._get_yt_dlp_path()
+        self._ensure_yt_dlp_exists()
+        
+        # Long tasks get pools segmented by category so a multi-hour
+        # playlist download can never occupy the shared executor's workers
+        # and starve short interactive jobs (metadata maps, deletes), and
+        # accent compute scales to the core count independently of both.
+        self.download_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix='fnote-dl')
+        self.compute_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(2, os.cpu_count() or 2), thread_name_prefix='fnote-cpu')
+
+        self.long_task_lock = threading.Lock()
+        # TTAS fast path for the lock: callers probe this plain flag first,
+        # so a rejected submit while a task runs touches no atomic at all.
+        # It is flipped only by the thread holding long_task_lock.
+        self._task_busy = False
+        self.active_task_name = None
+        # Accent colors are pure functions of the cover file's contents, so
+        # results are memoized keyed on (path, mtime, size); repeat views of
+        # a cover skip the decode/resize/HSV pipeline entirely.
+        self._accent_cache = OrderedDict()
+        self._accent_cache_lock = threading.Lock()
+        # Flat-playlist dumps are cached per URL for a few minutes so the
+        # preview-then-download flow runs yt-dlp's network probe only once.
+        self._url_info_cache = OrderedDict()
+
+    def _try_begin_task(self, name):
+        """Claims the long-task slot, returning False if one is running.
+
+        The unlocked _task_busy probe rejects the common already-busy case
+        without an atomic; the lock acquire below is the real CAS that
+        decides races between two idle-state submitters.
+        """
+        if self._task_busy:
+            return False
+        if not self.long_task_lock.acquire(blocking=False):
+            return False
+        self._task_busy = True
+        self.active_task_name = name
+        return True
+
+    def _end_task(self):
+        """Releases the long-task slot claimed by _try_begin_task."""
+        self.active_task_name = None
+        self._task_busy = False
+        self.long_task_lock.release()
+
+    def _get_yt_dlp_path(self):
+        """Determines the platform-specific path for the yt-dlp executable."""
+        if sys.platform == "win32": return os.path.join(self.bin_dir, 'yt-dlp.exe')
+        return os.path.join(self.bin_dir, 'yt-dlp')
+
+    def _ensure_yt_dlp_exists(self):
+        """Checks for the yt-dlp executable and downloads it if it's missing."""
+        if not os.path.exists(self.yt_dlp_path):
+            logger.info("yt-dlp not found. Attempting to download the latest version...")
+            try: self.update_yt_dlp_executable()
+            except Exception as e: logger.error(f"FATAL: Could not download yt-dlp. URL downloads will fail. Error: {e}")
+
+    def get_yt_dlp_version(self):
+        """Returns the version of the local yt-dlp executable."""
+        if not os.path.exists(self.yt_dlp_path): return "Not Found"
+        try:
+            # Add creationflags on Windows to suppress the console window
+            startupinfo = None
+            if sys.platform == "win32":
+                startupinfo = subprocess.STARTUPINFO()
+                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+                startupinfo.wShowWindow = subprocess.SW_HIDE
+
+            result = subprocess.run(
+                [self.yt_dlp_path, '--version'],
+                capture_output=True,
+                text=True,
+                check=True,
+                startupinfo=startupinfo  # Pass the new info here
+            )
+            return result.stdout.strip()
+        except (subprocess.CalledProcessError, FileNotFoundError): return "Error"
+
+    def update_yt_dlp_executable(self):
+        """Downloads the latest yt-dlp executable from GitHub atomically."""
+        logger.info("Fetching latest yt-dlp release information...")
+        response = requests.get(YT_DLP_UPDATE_URL, timeout=10)
+        response.raise_for_status()
+        assets, asset_name = response.json().get('assets', []), 'yt-dlp'
+        if sys.platform == "win32": asset_name = 'yt-dlp.exe'
+        elif sys.platform == "darwin": asset_name = 'yt-dlp_macos'
+        asset_url = next((asset['browser_download_url'] for asset in assets if asset['name'] == asset_name), None)
+        if not asset_url: raise Exception(f"Could not find a download link for '{asset_name}'.")
+
+        os.makedirs(self.bin_dir, exist_ok=True)
+        
+        # Download to a temporary file in the same directory to ensure atomic move/rename
+        temp_file_path = None
+        try:
+            with tempfile.NamedTemporaryFile(delete=False, dir=self.bin_dir, suffix='.tmp') as temp_file:
+                temp_file_path = temp_file.name
+                logger.info(f"Downloading {asset_name} to temporary file {temp_file_path}...")
+                with requests.get(asset_url, stream=True, timeout=30) as r:
+                    r.raise_for_status()
+                    # Copy the raw stream in 1 MiB chunks: a handful of loop
+                    # iterations for the whole binary instead of hundreds of
+                    # 8 KiB ones through iter_content.
+                    r.raw.decode_content = True  # In case the CDN gzips.
+                    shutil.copyfileobj(r.raw, temp_file, length=1024 * 1024)
+
+            # If download is successful, make it executable and move it to the final destination
+            if sys.platform != "win32":
+                os.chmod(temp_file_path, os.stat(temp_file_path).st_mode | stat.S_IEXEC)
+
+            # The temp file lives in bin_dir, so this is one atomic rename.
+            os.replace(temp_file_path, self.yt_dlp_path)
+            logger.info("yt-dlp has been successfully downloaded/updated.")
+            return {'status': 'success'}
+
+        except Exception as e:
+            # Clean up the temporary file on error
+            if temp_file_path and os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+            raise e # Re-raise the exception to be handled by the caller
+
+    def setup_songs_directory(self):
+        os.makedirs(SONGS_DIR, exist_ok=True)
+
+    # --- METADATA AND FILE PROCESSING (UNCHANGED) ---
+    def _extract_metadata_from_file(self, filepath):
+        name, artist, cover_path = None, None, None
+        base_name, _ = os.path.splitext(os.path.basename(filepath))
+        try:
+            # A single mutagen parse serves both the tag reads and the cover
+            # extraction; the old easy=True call reparsed the whole file.
+            audio = mutagen.File(filepath)
+            if not audio: raise ValueError("Mutagen could not parse the file.")
+            tags = audio.tags
+            if tags:
+                if isinstance(audio, MP3):
+                    name = tags['TIT2'].text[0] if 'TIT2' in tags else None
+                    artist = tags['TPE1'].text[0] if 'TPE1' in tags else None
+                else:
+                    # FLAC vorbis comments and MP4 atoms both map to lists.
+                    name_key, artist_key = ('\xa9nam', '\xa9ART') if isinstance(audio, M4A) else ('title', 'artist')
+                    name = (tags.get(name_key) or [None])[0]
+                    artist = (tags.get(artist_key) or [None])[0]
+            if not name:
+                parsed_artist, parsed_name = utils.parse_artist_title(os.path.basename(filepath))
+                name = parsed_name
+                if not artist: artist = parsed_artist
+            cover_data, ext = None, None
+            if isinstance(audio, MP3) and 'APIC:' in audio.tags:
+                artwork = audio.tags['APIC:']
+                cover_data, ext = artwork.data, 'png' if 'png' in artwork.mime else 'jpg'
+            elif isinstance(audio, FLAC) and audio.pictures:
+                artwork = audio.pictures[0]
+                cover_data, ext = artwork.data, 'png' if 'png' in artwork.mime else 'jpg'
+            elif isinstance(audio, M4A) and 'covr' in audio.tags and audio.tags['covr']:
+                artwork = audio.tags['covr'][0]
+                cover_data, ext = artwork, 'png' if artwork.imageformat == MP4Cover.FORMAT_PNG else 'jpg'
+            if cover_data:
+                saved_cover_path = os.path.join(SONGS_DIR, f"{base_name}_cover.{ext}")
+                with open(saved_cover_path, 'wb') as f: f.write(cover_data)
+                cover_path = utils.to_web_path(saved_cover_path)
+        except Exception as e:
+            logger.error(f"Error processing metadata for {filepath}: {e}")
+            if not name:
+                parsed_artist, parsed_name = utils.parse_artist_title(os.path.basename(filepath))
+                name, artist = parsed_name, parsed_artist
+        return {'name': name, 'artist': artist, 'cover_path': cover_path}
+    def write_metadata_to_file(self, web_path, details):
+        filepath = utils.web_to_os_path(web_path)
+        audio = mutagen.File(filepath, easy=True)
+        if not audio: return
+        if details.get('name'): audio['title'] = details['name']
+        if details.get('artist'): audio['artist'] = details['artist']
+        audio.save()
+    def embed_cover_in_file(self, web_audio_path, web_cover_path, data_bytes=None):
+        audio_path, cover_path = utils.web_to_os_path(web_audio_path), utils.web_to_os_path(web_cover_path)
+        if data_bytes is not None:
+            cover_data = data_bytes
+        else:
+            with open(cover_path, 'rb') as f: cover_data = f.read()
+        mime_type = 'image/jpeg' if cover_path.lower().endswith(('.jpg', '.jpeg')) else 'image/png'
+        audio = mutagen.File(audio_path)
+        if not audio: return
+        if isinstance(audio, MP3):
+            audio = MP3(audio_path)
+            audio.tags.add(APIC(encoding=3, mime=mime_type, type=3, desc=u'Cover', data=cover_data))
+        elif isinstance(audio, FLAC):
+            pic = mutagen.flac.Picture()
+            pic.data, pic.mime, pic.type = cover_data, mime_type, 3
+            audio.clear_pictures()
+            audio.add_picture(pic)
+        elif isinstance(audio, M4A):
+            fmt = MP4Cover.FORMAT_JPEG if mime_type == 'image/jpeg' else MP4Cover.FORMAT_PNG
+            audio['covr'] = [MP4Cover(cover_data, imageformat=fmt)]
+        audio.save()
+    _ACCENT_CACHE_MAX = 512
+
+    def generate_accent_color(self, cover_os_path):
+        try:
+            st = os.stat(cover_os_path)
+            cache_key = (cover_os_path, st.st_mtime_ns, st.st_size)
+            with self._accent_cache_lock:
+                cached = self._accent_cache.get(cache_key)
+                if cached is not None:
+                    self._accent_cache.move_to_end(cache_key)
+                    return cached
+            color = self._compute_accent_color(cover_os_path)
+            with self._accent_cache_lock:
+                self._accent_cache[cache_key] = color
+                if len(self._accent_cache) > self._ACCENT_CACHE_MAX:
+                    self._accent_cache.popitem(last=False)
+            return color
+        except Exception as e:
+            logger.error(f"Error generating accent color for {cover_os_path}: {e}")
+            return {'r': 150, 'g': 150, 'b': 150}
+
+    def _compute_accent_color(self, cover_os_path):
+        with Image.open(cover_os_path) as img:
+            # Pillow's C converter does the RGB->HSV branch work on uint8,
+            # so Python only sees the already-converted pixel array. A 32x32
+            # bilinear thumbnail is plenty for a 36-bucket hue histogram;
+            # LANCZOS sharpness bought nothing downstream of the binning.
+            small = img.resize((32, 32), Image.Resampling.BILINEAR)
+            pixels_hsv = np.asarray(small.convert("HSV")).reshape(-1, 3)
+            hue_bin_weights, s_in_bins, v_in_bins = _accent_hue_bins(pixels_hsv)
+            if np.isclose(hue_bin_weights.sum(), 0):
+                # Grayscale-ish cover: fall back on overall brightness,
+                # again via Pillow's C luminance conversion.
+                c = 200 if np.asarray(small.convert("L")).mean() < 100 else 80
+                return {'r': c, 'g': c, 'b': c}
+        dominant_hue_index = np.argmax(hue_bin_weights)
+        dominant_bin_weight = hue_bin_weights[dominant_hue_index]
+        avg_s, avg_v = s_in_bins[dominant_hue_index] / dominant_bin_weight, v_in_bins[dominant_hue_index] / dominant_bin_weight
+        final_s, final_v = min(1.0, avg_s * 1.2), min(1.0, max(0.6, avg_v))
+        dominant_hue_deg = (dominant_hue_index / 36.0) * 360.0
+        r, g, b = colorsys.hsv_to_rgb(dominant_hue_deg / 360.0, final_s, final_v)
+        return {'r': int(r*255), 'g': int(g*255), 'b': int(b*255)}
+    def get_cover_data(self, cover_os_path):
+        if not cover_os_path or not os.path.exists(cover_os_path): return None
+        image_format = os.path.splitext(cover_os_path)[1].lstrip('.').lower()
+        if image_format == 'jpg': image_format = 'jpeg'
+        # Assemble the data URL in one buffer: prefix + base64 bytes, then a
+        # single ascii decode. The old prefix f-string plus utf-8 decode built
+        # two extra full-size string copies per cover.
+        with open(cover_os_path, "rb") as image_file:
+            result = bytearray(b"data:image/%s;base64," % image_format.encode('ascii'))
+            result += base64.b64encode(image_file.read())
+        return result.decode('ascii')
+    def get_import_candidates_from_files(self, file_paths):
+        all_candidates, titles_to_check = [], []
+        # Metadata extraction is blocking file I/O plus mutagen parsing;
+        # fan the files across the worker pool so the reads overlap.
+        metadatas = list(self.executor.map(self._extract_metadata_from_file, file_paths))
+        for src_path, metadata in zip(file_paths, metadatas):
+            title = metadata.get('name') or os.path.splitext(os.path.basename(src_path))[0]
+            all_candidates.append({'source_path': src_path, 'title': title, 'artist': metadata.get('artist'), 'is_duplicate': False})
+            if title: titles_to_check.append(title)
+        if titles_to_check:
+            existing_titles_set = self.db_handler.get_existing_titles(titles_to_check)
+            for candidate in all_candidates:
+                if candidate['title'] and candidate['title'].lower() in existing_titles_set:
+                    candidate['is_duplicate'] = True
+        return all_candidates
+    def finalize_import_from_files(self, file_paths):
+        # Snapshot the songs directory once; collision probes are then set
+        # lookups instead of a stat syscall per candidate name. Names are
+        # claimed sequentially, then the copy + metadata work (the slow,
+        # I/O-bound part) runs across the worker pool.
+        existing = set(os.listdir(SONGS_DIR))
+        dest_os_paths = []
+        for src_path in file_paths:
+            filename = os.path.basename(src_path)
+            count, final_filename = 1, filename
+            while final_filename in existing:
+                base, ext = os.path.splitext(filename)
+                final_filename = f"{base}_{count}{ext}"
+                count += 1
+            existing.add(final_filename)
+            dest_os_paths.append(os.path.join(SONGS_DIR, final_filename))
+
+        def _copy_and_extract(src_path, dest_os_path):
+            shutil.copy2(src_path, dest_os_path)
+            return self._extract_metadata_from_file(dest_os_path)
+
+        metadatas = list(self.executor.map(_copy_and_extract, file_paths, dest_os_paths))
+        return [
+            {"name": metadata['name'], "artist": metadata['artist'], "path": utils.to_web_path(dest_os_path), "coverPath": metadata['cover_path'], "isMissing": False, "tagIds": []}
+            for dest_os_path, metadata in zip(dest_os_paths, metadatas)
+        ]
+    def _parse_ydl_error(self, error_string):
+        # Dump-parsing subprocesses run in bytes mode; decode their stderr here.
+        if isinstance(error_string, bytes):
+            error_string = error_string.decode('utf-8', 'replace')
+        err_lower = error_string.lower()
+        if 'unsupported url' in err_lower: return "The provided URL is not supported."
+        if 'unavailable' in err_lower: return "This video is unavailable."
+        if 'private' in err_lower: return "This video is private."
+        if 'age-restricted' in err_lower: return "This video is age-restricted."
+        if 'no such file or directory' in err_lower and 'ffmpeg' in err_lower: return "FFmpeg is not installed or not in PATH."
+        return error_string.split('ERROR:')[-1].strip()
+    _URL_INFO_TTL = 300
+    _URL_INFO_MAX = 32
+
+    def _fetch_playlist_info(self, url):
+        """Runs yt-dlp's flat-playlist dump for a URL and returns
+        (first_info, entries), caching results briefly per URL."""
+        now = time.monotonic()
+        cached = self._url_info_cache.get(url)
+        if cached and now - cached[0] < self._URL_INFO_TTL:
+            self._url_info_cache.move_to_end(url)
+            return cached[1], cached[2]
+        command = [self.yt_dlp_path, '--flat-playlist', '--ignore-errors', '--no-warnings', '--dump-json', url]
+        # Bytes mode: the dump is parsed straight from the subprocess output
+        # (utils.json_loads accepts bytes) with no intermediate str decode —
+        # a large playlist dump runs to megabytes.
+        result = subprocess.run(command, capture_output=True, check=True)
+        # Split and parse each line exactly once; the old version re-split
+        # the whole dump to peek at the first line and then reparsed it.
+        lines = result.stdout.strip().splitlines()
+        first_info = utils.json_loads(lines[0])
+        entries = [first_info] + [utils.json_loads(line) for line in lines[1:]] if 'entries' in first_info else [first_info]
+        self._url_info_cache[url] = (now, first_info, entries)
+        if len(self._url_info_cache) > self._URL_INFO_MAX:
+            self._url_info_cache.popitem(last=False)
+        return first_info, entries
+
+    def fetch_url_metadata(self, url):
+        if not os.path.exists(self.yt_dlp_path): return {'status': 'error', 'message': 'yt-dlp is not installed. Please update it in Settings.'}
+        try:
+            first_info, entries = self._fetch_playlist_info(url)
+            playlist_title = first_info.get('title', 'Playlist' if 'entries' in first_info else 'Single Video')
+            all_titles = [entry.get('title', 'Untitled') for entry in entries]
+            existing_titles_set = self.db_handler.get_existing_titles(all_titles)
+            valid_entries = []
+            for entry in entries:
+                title = entry.get('title', 'Untitled')
+                is_unavailable = title in ('[Deleted video]', '[Private video]')
+                valid_entries.append({'title': title, 'is_duplicate': (title.lower() in existing_titles_set) and not is_unavailable, 'is_unavailable': is_unavailable})
+            if not valid_entries: return {'status': 'error', 'message': 'No valid videos found.'}
+            return {'status': 'success', 'playlist_title': playlist_title, 'entries': valid_entries}
+        except subprocess.CalledProcessError as e: return {'status': 'error', 'message': self._parse_ydl_error(e.stderr or e.stdout)}
+        except Exception as e: return {'status': 'error', 'message': self._parse_ydl_error(str(e))}
+    @contextmanager
+    def download_single_from_url(self, url):
+        if not os.path.exists(self.yt_dlp_path): raise Exception("yt-dlp is not installed. Please update it in Settings.")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            command = [
+                self.yt_dlp_path, '--format', 'bestaudio/best', 
+                '-o', os.path.join(temp_dir, '%(title)s.%(ext)s'), 
+                '--extract-audio', '--audio-format', 'mp3', 
+                '--audio-quality', '192K', '--write-thumbnail', 
+                '--no-playlist', '--ignore-errors'
+            ]
+            if self.has_ffmpeg:
+                command.extend(['--ffmpeg-location', self.ffmpeg_path])
+            
+            command.append(url)
+
+            try:
+                subprocess.run(command, check=True, capture_output=True, text=True, encoding='utf-8')
+                yield temp_dir
+            except subprocess.CalledProcessError as e: raise Exception(self._parse_ydl_error(e.stderr or e.stdout)) from e
+    def get_ydl_info(self, url, temp_dir):
+        with os.scandir(temp_dir) as it:
+            downloaded_files = [e.name for e in it if e.name.endswith('.mp3') and e.is_file()]
+        if not downloaded_files: raise Exception("No MP3 file found in download directory.")
+        temp_audio_path = os.path.join(temp_dir, downloaded_files[0])
+        command = [self.yt_dlp_path, '--skip-download', '--dump-json', url]
+        result = subprocess.run(command, capture_output=True, check=True)
+        info_dict = utils.json_loads(result.stdout)
+        info_dict['requested_downloads'] = [{'filepath': temp_audio_path}]
+        return info_dict
+    def _process_ydl_entry(self, entry_info, temp_dir):
+        if not entry_info or 'requested_downloads' not in entry_info or not entry_info['requested_downloads']: return None
+        temp_audio_path = entry_info['requested_downloads'][0]['filepath']
+        if not os.path.exists(temp_audio_path): return None
+        original_filename = os.path.basename(temp_audio_path)
+        base, ext = os.path.splitext(original_filename)
+        # One directory snapshot replaces a stat per collision probe.
+        existing = set(os.listdir(SONGS_DIR))
+        final_filename, count = original_filename, 1
+        while final_filename in existing:
+            final_filename = f"{base}_{count}{ext}"
+            count += 1
+        dest_os_path = os.path.join(SONGS_DIR, final_filename)
+        shutil.move(temp_audio_path, dest_os_path)
+        web_audio_path = utils.to_web_path(dest_os_path)
+        song_name, song_artist = entry_info.get('title'), entry_info.get('artist') or entry_info.get('uploader')
+        temp_audio_basename, _ = os.path.splitext(os.path.basename(temp_audio_path))
+        with os.scandir(temp_dir) as it:
+            temp_cover_path = next((e.path for e in it if e.name.startswith(temp_audio_basename) and e.name.lower().endswith(('.webp', '.jpg', '.jpeg', '.png'))), None)
+        web_cover_path = None
+        if temp_cover_path:
+            final_audio_basename, cover_ext = os.path.splitext(final_filename)[0], os.path.splitext(temp_cover_path)[1]
+            new_cover_filename = f"{final_audio_basename}_cover{cover_ext}"
+            dest_cover_os_path = os.path.join(SONGS_DIR, new_cover_filename)
+            shutil.move(temp_cover_path, dest_cover_os_path)
+            web_cover_path = utils.to_web_path(dest_cover_os_path)
+        try:
+            self.write_metadata_to_file(web_audio_path, {'name': song_name, 'artist': song_artist})
+            if web_cover_path: self.embed_cover_in_file(web_audio_path, web_cover_path)
+        except Exception as e: logger.error(f"Could not write metadata for downloaded file {dest_os_path}: {e}")
+        return {"name": song_name, "artist": song_artist, "path": web_audio_path, "coverPath": web_cover_path, "isMissing": False, "tagIds": []}
+    def _safe_unlink(self, file_path):
+        if file_path and os.path.exists(file_path):
+            try: os.remove(file_path)
+            except OSError as e: logger.error(f"Could not remove file {file_path}: {e}")
+    def delete_files(self, file_paths):
+        _evict_served_caches(file_paths)
+        for file_path in file_paths:
+            self._safe_unlink(file_path)
+    def delete_files_parallel(self, file_paths):
+        """Deletes files by fanning the unlinks out across the executor; each
+        unlink is I/O-bound, so large batches benefit from concurrency."""
+        if not file_paths: return
+        _evict_served_caches(file_paths)
+        list(self.executor.map(self._safe_unlink, file_paths))
+    def show_in_explorer(self, web_path):
+        os_path = utils.web_to_os_path(web_path)
+        if not os.path.exists(os_path): return {'status': 'error', 'message': 'File not found.'}
+        absolute_path = os.path.abspath(os_path)
+        if sys.platform == "win32": subprocess.Popen(['explorer', '/select,', absolute_path])
+        elif sys.platform == "darwin": subprocess.Popen(['open', '-R', absolute_path])
+        else: subprocess.Popen(['xdg-open', os.path.dirname(absolute_path)])
+        return {'status': 'success'}
+    def open_external_link(self, url): webbrowser.open(url)
+    def export_playlist(self, playlist_name, save_path):
+        # Stream files straight into the archive; no temp-directory staging
+        # copy, so resident memory stays at one zip buffer per file. Stored
+        # (uncompressed) entries: MP3 and JPEG payloads don't deflate, so
+        # compressing them only burns CPU. The small JSON manifest still does.
+        export_data = self.db_handler.get_playlist_data_for_export(playlist_name)
+        with zipfile.ZipFile(save_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+            # Compact manifest via the fast serializer; the file is only ever
+            # read back by import_playlist, so indentation bought nothing.
+            archive.writestr('playlist_data.json', utils.json_dumps(export_data), compress_type=zipfile.ZIP_DEFLATED)
+            for song in export_data['songs']:
+                for key in ('path', 'coverPath'):
+                    if song.get(key):
+                        src_path = utils.web_to_os_path(song[key])
+                        if os.path.exists(src_path): archive.write(src_path, arcname=os.path.basename(src_path))
+    def export_playlist_as_m3u(self, playlist_name, save_path):
+        song_web_paths = self.db_handler.get_song_paths_for_playlist(playlist_name)
+        absolute_os_paths = [os.path.abspath(utils.web_to_os_path(p)) for p in song_web_paths]
+        with open(save_path, 'w', encoding='utf-8') as f:
+            f.write("#EXTM3U\n")
+            for path in absolute_os_paths: f.write(path + "\n")
+    def _extract_archive_member(self, archive, member_name, existing_files):
+        """Streams one archive member into SONGS_DIR under a collision-free name
+        and returns the destination web path."""
+        final_filename, count = member_name, 1
+        while final_filename in existing_files:
+            base, ext = os.path.splitext(member_name)
+            final_filename = f"{base}_{count}{ext}"
+            count += 1
+        # Record the chosen name so later members of this import can't take it.
+        existing_files.add(final_filename)
+        dest_os_path = os.path.join(SONGS_DIR, final_filename)
+        with archive.open(member_name) as src, open(dest_os_path, 'wb') as out:
+            shutil.copyfileobj(src, out, length=1 << 20)
+        return utils.to_web_path(dest_os_path)
+
+    def import_playlist(self, fnlist_path):
+        if not zipfile.is_zipfile(fnlist_path): raise ValueError("Invalid file format. Not a .fnlist archive.")
+        # Stream members out of the archive one at a time instead of
+        # extractall-ing the whole playlist to a temp directory first.
+        with zipfile.ZipFile(fnlist_path, 'r') as archive:
+            if 'playlist_data.json' not in archive.namelist(): raise ValueError("Invalid archive. 'playlist_data.json' manifest not found.")
+            with archive.open('playlist_data.json') as f: manifest = utils.json_loads(f.read())
+            all_playlist_names = self.db_handler.get_all_playlist_names()
+            original_playlist_name = manifest['name']
+            final_playlist_name = original_playlist_name
+            count = 1
+            while final_playlist_name in all_playlist_names:
+                final_playlist_name = f"{original_playlist_name} ({count})"
+                count += 1
+            # One directory snapshot; collision probes become set lookups and
+            # names claimed during this import are tracked in the same set.
+            all_song_files = set(os.listdir(SONGS_DIR))
+            for song in manifest['songs']:
+                song['path'] = self._extract_archive_member(archive, os.path.basename(song['path']), all_song_files)
+                if song.get('coverPath'):
+                    song['coverPath'] = self._extract_archive_member(archive, os.path.basename(song['coverPath']), all_song_files)
+            new_playlist = self.db_handler.import_playlist_from_data(manifest, final_playlist_name)
+            return new_playlist
+
+    # --- DOWNLOAD WORKER (MOVED FROM song_api.py) ---
+    def _background_download_worker(self, entries_to_download, url_for_fallback):
+        newly_added_songs, total = [], len(entries_to_download)
+        for i, entry in enumerate(entries_to_download):
+            # JSON-encode the id once (C-level escaping) instead of a
+            # Python replace chain per broadcast; ids keep their raw form
+            # and so keep matching the progress_start item list.
+            entry_id_js = utils.json_dumps(str(entry.get('id', f"item_{i}")))
+            entry_url = entry.get('webpage_url', entry.get('url', url_for_fallback))
+            try:
+                self.window_manager.broadcast_js(f"window.progress_update({entry_id_js}, 'working', 'Downloading...', {i + 1}, {total})")
+                with self.download_single_from_url(entry_url) as temp_dir:
+                    info_dict = self.get_ydl_info(entry_url, temp_dir)
+                    processed_song = self._process_ydl_entry(info_dict, temp_dir)
+                    if processed_song:
+                        newly_added_songs.append(processed_song)
+                        self.window_manager.broadcast_js(f"window.progress_update({entry_id_js}, 'success', 'Done', {i + 1}, {total})")
+                    else: raise Exception("File processing failed after download.")
+            except Exception as e:
+                self.window_manager.broadcast_js(f"window.progress_update({entry_id_js}, 'error', {utils.json_dumps(str(e))}, {i + 1}, {total})")
+        return newly_added_songs
+    def _on_url_download_complete(self, future):
+        try:
+            newly_added = future.result()
+            if newly_added:
+                self.window_manager.broadcast_js(f"window.completeUrlDownload({utils.json_dumps({'status': 'success', 'songs': newly_added})})")
+                self.window_manager.broadcast_js(f"window.progress_finish('Download complete. {len(newly_added)} song(s) added.', false)")
+            else: self.window_manager.broadcast_js("window.progress_finish('Download finished. No new songs were added.', false, true)")
+        except Exception as e:
+            self.window_manager.broadcast_js(f"window.progress_finish({utils.json_dumps(f'Download failed: {e}')}, true)")
+        finally:
+            self._end_task()
+    def start_url_download(self, url, indices=None):
+        if not self._try_begin_task('URL Download'): return {'status': 'error', 'message': f'Another task ({self.active_task_name}) is already in progress.'}
+        try:
+            # The preview step usually fetched this URL moments ago, so the
+            # flat-playlist dump comes from the cache instead of a second
+            # multi-second yt-dlp invocation.
+            info, all_entries = self._fetch_playlist_info(url)
+            entries_to_download = [all_entries[i-1] for i in indices if 0 < i <= len(all_entries)] if indices else all_entries
+            if not entries_to_download:
+                self._end_task()
+                return {'status': 'error', 'message': 'No items selected for download.'}
+            # Ids stay raw here: the payload is JSON-encoded whole, and the
+            # worker JSON-encodes the same raw ids in its updates.
+            progress_items = [{'id': str(entry.get('id', f'item_{i}')), 'name': entry.get('title', 'Untitled')} for i, entry in enumerate(entries_to_download)]
+            title = f"Downloading from {info.get('title', 'URL')}"
+            self.window_manager.broadcast_js(f"window.progress_start({utils.json_dumps(title)}, {utils.json_dumps(progress_items)})")
+            self.active_task_name = f"Downloading from {info.get('title', 'URL')}"
+            future = self.download_executor.submit(self._background_download_worker, entries_to_download, url)
+            future.add_done_callback(self._on_url_download_complete)
+            return {'status': 'processing'}
+        except Exception as e:
+            self._end_task()
+            return {'status': 'error', 'message': str(e)}
+
+    # --- REFRESH ACCENTS WORKER (MOVED FROM song_api.py) ---
+    def _background_refresh_accents(self):
+        try:
+            all_songs_with_covers = self.db_handler.get_all_songs_with_covers()
+            total = len(all_songs_with_covers)
+            if total == 0:
+                self.window_manager.broadcast_js("window.completeAccentRefresh('No songs with covers to refresh.', false)")
+                return
+            # Lift the tuple rows into parallel lists up front: everything
+            # below indexes plain strings, and each cover path is
+            # scheme-converted once. Bound locals keep the comprehensions
+            # free of repeated attribute lookups.
+            basename, to_os = os.path.basename, utils.web_to_os_path
+            paths = [row[0] for row in all_songs_with_covers]
+            cover_os_paths = [to_os(row[1]) for row in all_songs_with_covers]
+            progress_items = [{'id': p, 'name': basename(p)} for p in paths]
+            self.window_manager.broadcast_js(f"window.progress_start('Refreshing Accent Colors', {utils.json_dumps(progress_items)})")
+            # Coalesce per-song updates into one bridge crossing per batch:
+            # three broadcast_js calls per song meant ~3N synchronous webview
+            # round-trips, which dominated wall time once the accent cache
+            # made the color computation itself cheap.
+            # Colors ride the same batch cadence into one executemany
+            # transaction per flush instead of a write (and its fsync) per
+            # song.
+            pending = []
+            color_updates = []
+            last_flush = time.monotonic()
+
+            def _flush():
+                nonlocal last_flush
+                if color_updates:
+                    self.db_handler.save_song_colors_bulk(color_updates)
+                    color_updates.clear()
+                if pending:
+                    self.window_manager.broadcast_js(f"window.progress_update_batch({utils.json_dumps(pending)})")
+                    pending.clear()
+                last_flush = time.monotonic()
+
+            # Fan the decode/HSV work out across the compute pool. This
+            # orchestrator runs on that pool too, but it is sized to at
+            # least two workers, so the per-cover tasks (which submit
+            # nothing themselves) always have a worker to run on. Image
+            # decode happens in Pillow's C code with the GIL released, so
+            # threads scale to core count here. DB writes and broadcasts
+            # stay on this consumer thread, keeping SQLite single-writer.
+            # Updates carry the song's index into the progress_start item
+            # list instead of repeating the full path string, cutting most
+            # of the bytes serialized and parsed per batch.
+            done_count = 0
+            futures = {
+                self.compute_executor.submit(self.generate_accent_color, cover_os_paths[idx]): idx
+                for idx in range(total)
+            }
+            for future in concurrent.futures.as_completed(futures):
+                idx = futures[future]
+                done_count += 1
+                try:
+                    new_color = future.result()
+                    update = {'id': idx, 'status': 'success', 'msg': 'Done', 'i': done_count, 'total': total}
+                    if new_color:
+                        color_updates.append((paths[idx], new_color))
+                        update['color'] = new_color
+                    pending.append(update)
+                except Exception as e:
+                    pending.append({'id': idx, 'status': 'error', 'msg': str(e), 'i': done_count, 'total': total})
+                if len(pending) >= 32 or time.monotonic() - last_flush >= 0.05:
+                    _flush()
+            _flush()
+            self.window_manager.broadcast_js("window.completeAccentRefresh('Accent refresh complete!', false)")
+        except Exception as e:
+            error_message = json.dumps(f"An error occurred: {e}")
+            self.window_manager.broadcast_js(f"window.completeAccentRefresh({error_message}, true)")
+        finally:
+            self._end_task()
+    def refresh_all_accent_colors(self):
+        if not self._try_begin_task("Refreshing Accent Colors"): return {'status': 'error', 'message': f'Another task ({self.active_task_name}) is already in progress.'}
+        self.compute_executor.submit(self._background_refresh_accents)
         return {'status': 'processing'}
\ No newline at end of file
@@ -194,18 +194,10 @@ export function initEditDetailsModalListeners() {
 
         try {
             const response = await Api.changeSongCover(songToEdit.path);
-            if (response?.status === 'success') {
-                const songUpdate = response.songUpdate; // { coverPath, coverData }
-                DOM.editDetailsCoverImg.src = songUpdate.coverData;
-
-                State.setCoverInCache(songToEdit.path, songUpdate.coverData);
-                State.updateSong({
-                    path: songToEdit.path,
-                    coverPath: songUpdate.coverPath,
-                    accentColor: null
-                });
-                
-                UI.showToast('Cover updated successfully.', 'success');
+            if (response?.status === 'queued') {
+                // The copy/embed pipeline runs in the backend's thread pool;
+                // window.updateSongCover is invoked when it completes.
+                UI.showToast('Updating cover…', 'info');
             } else if (response?.status === 'error') {
                 UI.showToast(`Error: ${response.message}`, 'error');
             }
@@ -1,6 +1,10 @@
 import os
 import re
+import shutil
 import sys
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 
 # ... (APP_DATA_DIR and YT_DLP_UPDATE_URL are unchanged) ...
 APP_DATA_DIR = os.path.join(os.path.expanduser('~'), '.fnote')
@@ -9,11 +13,31 @@ YT_DLP_UPDATE_URL = "https://api.github.com/repos/yt-dlp/yt-dlp/releases/latest"
 
 # Define the new scheme as a constant
 LOCAL_DOMAIN = 'https://fnote.local'
+_LOCAL_PREFIX = LOCAL_DOMAIN + '/'
+_LOCAL_PREFIX_LEN = len(_LOCAL_PREFIX)
 
+# Every mapped path lives under APP_DATA_DIR with known-safe relative
+# components, so the conversions below are pure string transforms: one
+# prefix strip or concat plus (on Windows) a separator replace, instead
+# of relpath/join doing per-component validation.
+_APP_DATA_DIR_SEP = APP_DATA_DIR + os.sep
+_APP_DATA_DIR_SEP_LEN = len(_APP_DATA_DIR_SEP)
+
+if os.sep == '/':
+    def _rel_to_os_path(path_part):
+        return _APP_DATA_DIR_SEP + path_part
+else:
+    def _rel_to_os_path(path_part):
+        return _APP_DATA_DIR_SEP + path_part.replace('/', os.sep)
+
+@lru_cache(maxsize=4096)
 def to_web_path(os_path):
     """
     Converts a local OS-specific absolute path to a local HTTPS URI.
-    
+
+    Memoized: the mapping is a pure function of the path string and the
+    fixed APP_DATA_DIR, and the same song paths recur on every render.
+
     Args:
         os_path (str): The OS path (e.g., 'C:\\Users\\...\\.fnote\\songs\\mysong.mp3').
     
@@ -22,18 +46,26 @@ def to_web_path(os_path):
     """
     if os_path is None:
         return None
-    
-    relative_path = os.path.relpath(os_path, APP_DATA_DIR)
-    
+
+    if os_path.startswith(_APP_DATA_DIR_SEP):
+        relative_path = os_path[_APP_DATA_DIR_SEP_LEN:]
+    else:
+        # Paths outside the data dir (shouldn't happen in practice) still
+        # get relpath's full .. handling.
+        relative_path = os.path.relpath(os_path, APP_DATA_DIR)
+
     # Use the new fake domain instead of 'fnote://'
     # The leading slash is important for the URL path.
-    return f"{LOCAL_DOMAIN}/" + relative_path.replace(os.sep, '/')
+    return _LOCAL_PREFIX + relative_path.replace(os.sep, '/')
 
+@lru_cache(maxsize=4096)
 def web_to_os_path(web_path):
     """
     Converts a local HTTPS URI back to a local OS-specific absolute path.
     Also handles old custom schemes for backward compatibility.
-    
+
+    Memoized like to_web_path; relpath/join work runs once per distinct path.
+
     Args:
         web_path (str): The custom URI or old scheme path.
     
@@ -43,17 +75,15 @@ def web_to_os_path(web_path):
     if web_path is None:
         return None
 
-    if web_path.startswith(f"{LOCAL_DOMAIN}/"):
+    if web_path.startswith(_LOCAL_PREFIX):
         # Handle the new scheme
-        path_part = web_path[len(f"{LOCAL_DOMAIN}/"):]
-        return os.path.join(APP_DATA_DIR, *path_part.split('/'))
+        return _rel_to_os_path(web_path[_LOCAL_PREFIX_LEN:])
     elif web_path.startswith('fnote://'):
         # Handle old scheme for backward compatibility with existing databases
-        path_part = web_path[len('fnote://'):]
-        return os.path.join(APP_DATA_DIR, *path_part.split('/'))
+        return _rel_to_os_path(web_path[len('fnote://'):])
     else:
         # Handle very old relative paths
-        return os.path.join(APP_DATA_DIR, *web_path.split('/'))
+        return _rel_to_os_path(web_path)
 
 def parse_artist_title(filename):
     """
@@ -71,28 +101,135 @@ def parse_artist_title(filename):
         return parts[0].strip(), parts[1].strip()
     return None, name_part
 
+# Compiled once at import; calls skip re's per-call cache lookup and
+# flag merge. Matches t:tag, tag:tag, and the quoted forms of both.
+_TAG_RE = re.compile(r"(?:t:|tag:)(?:'([^']+)'|\"([^\"]+)\"|(\S+))", re.IGNORECASE)
+
+@lru_cache(maxsize=1024)
 def parse_search_query(query):
     """
     Parses a search query string into text and tag components.
-    
+
+    Results are memoized: searches are keystroke-driven, so the same query
+    prefixes are re-parsed constantly. Callers must not mutate the result.
+
     Args:
         query (str): The search string (e.g., "upbeat t:electronic 'vlog music'").
-    
+
     Returns:
         dict: A dictionary with 'text' and 'tags' keys.
     """
-    tag_pattern = r"(?:t:|tag:)(?:'([^']+)'|\"([^\"]+)\"|(\S+))"
-    
-    # Find all tag values
-    found_tags = re.findall(tag_pattern, query, re.IGNORECASE)
-    # re.findall returns tuples of capturing groups, e.g., [('electronic', '', ''), ('', 'vlog music', '')]
-    # We need to flatten and filter out empty strings.
-    tags = [item for sublist in found_tags for item in sublist if item]
-    
-    # Remove the tag expressions from the query to get the plain text part
-    text = re.sub(tag_pattern, '', query, flags=re.IGNORECASE).strip().lower()
-    
-    return {'text': text, 'tags': [tag.lower() for tag in tags]}
+    # One pass: the sub callback collects the tag value (whichever of the
+    # quoted/bare groups matched) while stripping the expression from the
+    # text, instead of a findall scan followed by a second sub scan.
+    tags = []
+
+    def _collect(match):
+        tags.append((match.group(1) or match.group(2) or match.group(3)).lower())
+        return ''
+
+    text = _TAG_RE.sub(_collect, query).strip().lower()
+    return {'text': text, 'tags': tags}
+
+# orjson (a C extension with SIMD-accelerated escaping) is used when present
+# for hot-path serialization; the stdlib json module is the fallback.
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+import json as _json
+
+if _orjson is not None:
+    def json_dumps(obj):
+        """Serializes an object to a JSON string using the fastest available backend."""
+        return _orjson.dumps(obj).decode()
+
+    def json_loads(data):
+        """Parses JSON from str or bytes using the fastest available backend."""
+        return _orjson.loads(data)
+else:
+    def json_dumps(obj):
+        """Serializes an object to a JSON string using the fastest available backend."""
+        return _json.dumps(obj)
+
+    def json_loads(data):
+        """Parses JSON from str or bytes using the fastest available backend."""
+        return _json.loads(data)
+
+def fast_copy(src, dst):
+    """
+    Copies a file like shutil.copy2, but prefers the in-kernel
+    os.copy_file_range on Linux so the data never bounces through userspace
+    buffers. Falls back to shutil.copyfile (which already uses
+    sendfile/CopyFileExW where available) and preserves timestamps.
+    """
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+        except OSError:
+            # copy_file_range can fail across filesystems on older kernels.
+            shutil.copyfile(src, dst)
+    else:
+        shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+    return dst
+
+class SizedLRUCache:
+    """
+    A thread-safe LRU cache bounded by total byte size rather than entry count.
+
+    Used for caching large encoded payloads (e.g., base64 data URIs) where the
+    cost of an entry is its size in bytes, not the number of entries.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (value, size_in_bytes)
+        self._total_bytes = 0
+
+    def get(self, key):
+        """Returns the cached value for a key, or None. Marks the entry as recently used."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size=None):
+        """Inserts a value, evicting least-recently-used entries to stay under budget."""
+        if size is None:
+            size = len(value)
+        if size > self.max_bytes:
+            return  # Too large to ever fit; don't thrash the cache for it.
+        with self._lock:
+            old_entry = self._data.pop(key, None)
+            if old_entry is not None:
+                self._total_bytes -= old_entry[1]
+            self._data[key] = (value, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self._total_bytes -= evicted_size
+
+    def evict(self, predicate):
+        """Removes all entries whose key matches the given predicate."""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                _, size = self._data.pop(key)
+                self._total_bytes -= size
+
+    def clear(self):
+        """Empties the cache."""
+        with self._lock:
+            self._data.clear()
+            self._total_bytes = 0
 
 def resource_path(relative_path):
     """
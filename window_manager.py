@@ -1,8 +1,11 @@
 import webview
+import ctypes
+import sys
 import threading
 import time
 import json
 import logging
+from collections import deque
 from python_utils import resource_path
 
 logger = logging.getLogger(__name__)
@@ -12,6 +15,17 @@ def ease_out_quad(t):
     return t * (2 - t)
 
 class WindowManager:
+    # Slots turn the per-broadcast and per-frame attribute lookups into
+    # fixed-offset loads instead of instance-dict probes.
+    __slots__ = (
+        'api', 'config', 'windows',
+        'mini_player_anim_lock', 'active_anim_thread', 'stop_anim_event',
+        'MINI_WIDTH_EXPANDED', 'MINI_WIDTH_COLLAPSED', 'MINI_HEIGHT',
+        '_screen_size', '_screen_size_at',
+        '_alive_window_ids', '_mini_visible',
+        '_js_queues', '_js_events',
+    )
+
     def __init__(self, api_facade, config):
         self.api = api_facade
         self.config = config
@@ -27,6 +41,28 @@ class WindowManager:
         self.MINI_WIDTH_COLLAPSED = 74
         self.MINI_HEIGHT = 80
 
+        # Cached primary-screen dimensions; see _get_screen_size.
+        self._screen_size = None
+        self._screen_size_at = 0.0
+
+        # Liveness is tracked via each window's closed event instead of
+        # scanning webview.windows on every broadcast; _mini_visible gates
+        # mini-player traffic so a torn-down mini costs producers nothing.
+        self._alive_window_ids = set()
+        self._mini_visible = False
+
+        # broadcast_js queues: snippets are coalesced and flushed by one
+        # drain thread per window, so producers never block on the
+        # synchronous evaluate_js bridge (COM marshalling into the WebView2
+        # UI thread on Windows) and a stalled window can't hold up the
+        # other. deque.append/popleft are atomic under the GIL, so the
+        # single-producer-path/single-consumer pairs need no lock.
+        self._js_queues = {'main': deque(), 'mini': deque()}
+        self._js_events = {'main': threading.Event(), 'mini': threading.Event()}
+        for name in ('main', 'mini'):
+            threading.Thread(target=self._drain_js_queue, args=(name,),
+                             daemon=True, name=f'fnote-js-drain-{name}').start()
+
     def create_main_window(self):
         """Creates and returns the main application window."""
         logger.info("Creating main window.")
@@ -38,30 +74,96 @@ class WindowManager:
             x=self.config.get('windowX'),
             y=self.config.get('windowY')
         )
+        self._track_window(window)
         self.windows['main'] = window
         return window
 
+    def _track_window(self, window):
+        """Registers a window for liveness checks.
+
+        Broadcast paths test id(window) against this set — an O(1) probe —
+        rather than scanning the webview.windows list per flush; the
+        window's closed event retires the id.
+        """
+        wid = id(window)
+        self._alive_window_ids.add(wid)
+
+        def _on_closed():
+            self._alive_window_ids.discard(wid)
+            if window is self.windows.get('mini'):
+                self._mini_visible = False
+        window.events.closed += _on_closed
+
+    _SCREEN_TTL = 60
+
+    def _get_screen_size(self):
+        """Returns the primary screen's (width, height), cached briefly.
+
+        webview.screens round-trips to the display server on every read.
+        Geometry changes rarely (resolution change, monitor hotplug), so a
+        short TTL replaces per-call queries while still picking up a new
+        layout within a minute.
+        """
+        now = time.monotonic()
+        if self._screen_size is None or now - self._screen_size_at >= self._SCREEN_TTL:
+            screen = webview.screens[0]
+            self._screen_size = (screen.width, screen.height)
+            self._screen_size_at = now
+        return self._screen_size
+
     def create_mini_player_window(self):
         """Creates and returns the mini-player window."""
         logger.info("Creating mini-player window.")
-        screen = webview.screens[0]
+        screen_w, screen_h = self._get_screen_size()
         width, height = self.MINI_WIDTH_EXPANDED, self.MINI_HEIGHT
-        x, y = screen.width - width - 0, screen.height - height - 80
+        x, y = screen_w - width - 0, screen_h - height - 80
         window = webview.create_window(
             'FNote Mini-Player', resource_path('mini_player.html'), js_api=self.api,
             width=width, height=height, x=x, y=y,
             resizable=True, frameless=True, on_top=True,
             background_color='#000000'
         )
+        self._track_window(window)
         self.windows['mini'] = window
+        self._mini_visible = True
         return window
 
     def broadcast_js(self, js_code):
-        """Executes a JS code snippet on all active windows."""
-        for window in (self.windows['main'], self.windows['mini']):
-            if window and window in webview.windows:
-                try: window.evaluate_js(js_code)
-                except Exception as e: logger.info(f"Could not broadcast to a closed or invalid window: {e}")
+        """Queues a JS snippet for execution on all active windows.
+
+        Snippets are batched by each window's drain thread into one
+        evaluate_js call per ~16ms tick, so tight loops issuing many
+        updates cost a handful of bridge crossings instead of one per
+        call. Execution order is preserved per window; the caller returns
+        immediately without touching a lock or the windows list.
+        """
+        for name in ('main', 'mini'):
+            self._js_queues[name].append(js_code)
+            self._js_events[name].set()
+
+    def _drain_js_queue(self, name):
+        """Flushes one window's queued JS snippets, coalescing bursts."""
+        q, event = self._js_queues[name], self._js_events[name]
+        while True:
+            event.wait()
+            # Let a burst of producers accumulate before paying for the
+            # bridge crossing; 16ms matches one frame at 60Hz.
+            time.sleep(0.016)
+            # Clear before draining: an append racing past the pop loop
+            # re-sets the event and is picked up next iteration.
+            event.clear()
+            batch = []
+            while q:
+                batch.append(q.popleft())
+            if not batch:
+                continue
+            # The closed-window check runs here, on the consumer, never on
+            # the broadcasting caller; snippets for a missing window drop.
+            window = self.windows.get(name)
+            if not window or id(window) not in self._alive_window_ids:
+                continue
+            try: window.evaluate_js(';\n'.join(batch))
+            except Exception as e: logger.info(f"Could not broadcast to a closed or invalid window: {e}")
 
     def get_current_player_state(self):
         """Gets the full current state from the main window's JS context."""
@@ -80,6 +182,10 @@ class WindowManager:
 
     def broadcast_state_change(self, payload):
         """Broadcasts a state change to all windows."""
+        # Skip serialization and the IPC round trip outright when no
+        # mini-player is up, instead of letting evaluate_js fail after it.
+        if not self._mini_visible:
+            return
         if self.windows['mini']:
              safe_payload = json.dumps(payload)
              # Check if the function exists in JS before calling it to prevent race conditions on window creation.
@@ -93,34 +199,68 @@ class WindowManager:
         main, mini = self.windows.get('main'), self.windows.get('mini')
         if enable:
             if main: main.hide()
-            if not mini or mini not in webview.windows: self.windows['mini'] = self.create_mini_player_window()
-            else: mini.show()
+            if not mini or id(mini) not in self._alive_window_ids: self.windows['mini'] = self.create_mini_player_window()
+            else: mini.show(); self._mini_visible = True
         else:
+            self._mini_visible = False
             if mini: mini.destroy(); self.windows['mini'] = None
             if main: main.show()
             else: self.windows['main'] = self.create_main_window()
         return {'status': 'success'}
 
+    @staticmethod
+    def _set_geometry(window_ref, x, y, w, h):
+        """Applies position and size in one native call where possible.
+
+        On Windows, SetWindowPos moves and resizes atomically — one
+        cross-thread call and one repaint per frame instead of two.
+        Elsewhere (or if the native handle isn't exposed by this pywebview
+        backend) it falls back to the portable move+resize pair.
+        """
+        if sys.platform == 'win32':
+            try:
+                hwnd = int(window_ref.native.Handle)
+                # SWP_NOZORDER | SWP_NOACTIVATE
+                ctypes.windll.user32.SetWindowPos(hwnd, 0, x, y, w, h, 0x0004 | 0x0010)
+                return
+            except Exception:
+                pass
+        window_ref.move(x, y)
+        window_ref.resize(w, h)
+
     def _animate_window(self, window_ref, start_x, start_y, start_w, start_h, end_x, end_y, end_w, end_h, duration, stop_event):
-        start_time = time.time()
+        # Deadline-based frame pacing on the monotonic clock: each frame
+        # sleeps only for whatever remains of its 1/60s slot after the
+        # geometry call, so slow IPC shortens the sleep instead of
+        # stretching the frame, and wall-clock jumps can't warp timing.
+        frame = 1 / 60
+        # Per-frame arithmetic is one multiply-add per axis: the geometry
+        # deltas and reciprocal duration are loop invariants.
+        dx, dy, dw, dh = end_x - start_x, end_y - start_y, end_w - start_w, end_h - start_h
+        duration_inv = 1.0 / duration
+        start_time = time.monotonic()
+        next_t = start_time
         while True:
             if stop_event.is_set(): return
-            elapsed, progress = time.time() - start_time, min((time.time() - start_time) / duration, 1.0)
+            now = time.monotonic()
+            progress = min((now - start_time) * duration_inv, 1.0)
             eased_progress = ease_out_quad(progress)
-            current_x, current_y = int(start_x + (end_x - start_x) * eased_progress), int(start_y + (end_y - start_y) * eased_progress)
-            current_w, current_h = int(start_w + (end_w - start_w) * eased_progress), int(start_h + (end_h - start_h) * eased_progress)
+            current_x, current_y = int(start_x + dx * eased_progress), int(start_y + dy * eased_progress)
+            current_w, current_h = int(start_w + dw * eased_progress), int(start_h + dh * eased_progress)
             try:
                 if window_ref not in webview.windows: break
-                window_ref.move(current_x, current_y)
-                window_ref.resize(current_w, current_h)
+                self._set_geometry(window_ref, current_x, current_y, current_w, current_h)
             except Exception as e:
                 logger.info(f"Window animation interrupted: {e}"); break
             if progress >= 1.0:
                 try:
-                    if window_ref in webview.windows: window_ref.move(end_x, end_y); window_ref.resize(end_w, end_h)
+                    if window_ref in webview.windows: self._set_geometry(window_ref, end_x, end_y, end_w, end_h)
                 except: pass
                 break
-            time.sleep(1/120)
+            next_t += frame
+            remaining = next_t - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
 
     def _animate_window_geometry(self, window_ref, end_x, end_y, end_w, end_h, duration=0.2):
         if not window_ref or window_ref not in webview.windows: return
@@ -141,14 +281,14 @@ class WindowManager:
             if not mini_window or mini_window not in webview.windows:
                 return {'status': 'error', 'message': 'Mini-player not found or has been closed.'}
             try:
-                screen = webview.screens[0]
-                x_padding, y_padding, target_y = 0, 80, screen.height - self.MINI_HEIGHT - 80
+                screen_w, screen_h = self._get_screen_size()
+                x_padding, y_padding, target_y = 0, 80, screen_h - self.MINI_HEIGHT - 80
                 if is_collapsed:
                     target_width = self.MINI_WIDTH_COLLAPSED
-                    target_x = screen.width - target_width - x_padding
+                    target_x = screen_w - target_width - x_padding
                 else:
                     target_width = self.MINI_WIDTH_EXPANDED
-                    target_x = screen.width - target_width - x_padding
+                    target_x = screen_w - target_width - x_padding
                 self._animate_window_geometry(mini_window, target_x, target_y, target_width, self.MINI_HEIGHT, 0.25)
                 return {'status': 'success'}
             except Exception as e: